@@ -0,0 +1,112 @@
+"""
+HNSW latency-vs-recall sweep for choosing HNSW_M and HNSW_SEARCH_EF.
+
+Builds an in-memory Chroma collection per (M, ef_search) over synthetic
+clustered vectors (embedding-sized, L2-normalised, cosine space as in
+the app) and measures query latency and recall@k against exact
+brute-force neighbours. Needs only chromadb (and its numpy).
+
+    cd backend
+    python benchmarks/hnsw_sweep.py
+    python benchmarks/hnsw_sweep.py --vectors 100000 --m 16 32 --ef 32 64 128 256
+"""
+import argparse
+import statistics
+import time
+
+import chromadb
+import numpy as np
+
+
+def synthetic_vectors(rng, count: int, dimensions: int, clusters: int) -> np.ndarray:
+    """Gaussian clusters around random centres, like topic-grouped chunks."""
+    centres = rng.normal(size=(clusters, dimensions))
+    labels = rng.integers(0, clusters, size=count)
+    vectors = centres[labels] + rng.normal(scale=0.6, size=(count, dimensions))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def exact_neighbours(corpus: np.ndarray, queries: np.ndarray, k: int) -> list:
+    similarities = queries @ corpus.T
+    top = np.argpartition(-similarities, k, axis=1)[:, :k]
+    return [set(row.tolist()) for row in top]
+
+
+def build_collection(client, corpus: np.ndarray, m: int, ef: int, construction_ef: int, batch: int):
+    """
+    A fresh collection per setting: Chroma only applies HNSW parameters
+    when the index is built (collection.modify updates the stored config
+    but not an index already loaded), which is also how the app sets them.
+    """
+    collection = client.create_collection(f"sweep-m{m}-ef{ef}", metadata={
+        "hnsw:space": "cosine",
+        "hnsw:M": m,
+        "hnsw:construction_ef": construction_ef,
+        "hnsw:search_ef": ef,
+    })
+    started = time.perf_counter()
+    for start in range(0, len(corpus), batch):
+        chunk = corpus[start:start + batch]
+        collection.add(
+            ids=[str(i) for i in range(start, start + len(chunk))],
+            embeddings=chunk
+        )
+    return collection, time.perf_counter() - started
+
+
+def measure(collection, queries: np.ndarray, truth: list, k: int) -> dict:
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        result = collection.query(query_embeddings=[query], n_results=k, include=[])
+        latencies.append(time.perf_counter() - started)
+        hits += len(expected & {int(i) for i in result["ids"][0]})
+    latencies.sort()
+    return {
+        "recall": hits / (k * len(queries)),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--clusters", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--ef", type=int, nargs="+", default=[32, 64, 100, 200])
+    parser.add_argument("--construction-ef", type=int, default=100)
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    corpus = synthetic_vectors(rng, args.vectors, args.dimensions, args.clusters)
+    queries = synthetic_vectors(rng, args.queries, args.dimensions, args.clusters)
+    truth = exact_neighbours(corpus, queries, args.k)
+
+    client = chromadb.EphemeralClient()
+    print(
+        f"{args.vectors} vectors x {args.dimensions} dims, {args.queries} queries, "
+        f"recall@{args.k}, construction_ef={args.construction_ef}\n"
+    )
+    print(f"{'M':>4} {'ef_search':>10} {'recall':>8} {'p50 ms':>8} {'p95 ms':>8} {'build s':>8}")
+
+    for m in args.m:
+        for ef in args.ef:
+            collection, build_seconds = build_collection(
+                client, corpus, m, ef, args.construction_ef, args.batch
+            )
+            row = measure(collection, queries, truth, args.k)
+            print(
+                f"{m:>4} {ef:>10} {row['recall']:>8.3f} {row['p50_ms']:>8.2f} "
+                f"{row['p95_ms']:>8.2f} {build_seconds:>8.1f}"
+            )
+            client.delete_collection(collection.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Ingest benchmark: wall time and embedding throughput for one document.
+
+Runs the real write path (iter_chunks -> summarise_chunks ->
+create_vector_store into a scratch Chroma store) with the Gemini
+embedding call replaced by a stub that sleeps like the API does, so the
+numbers show what batching and EMBED_CONCURRENCY buy without network
+noise or quota.
+
+    cd backend
+    python benchmarks/ingest_embedding_throughput.py --chunks 500
+    EMBED_BATCH_SIZE=64 EMBED_CONCURRENCY=8 python benchmarks/ingest_embedding_throughput.py
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from itertools import count, islice
+from pathlib import Path
+
+SCRATCH = Path(tempfile.mkdtemp(prefix="campusgpt-bench-"))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ["CHUNK_CACHE_PATH"] = str(SCRATCH / "chunk_cache.sqlite3")
+os.environ["LEXICAL_INDEX_PATH"] = str(SCRATCH / "lexical_index.sqlite3")
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ingestion.utils as ingest_utils  # noqa: E402
+import retrieval.vector_store as vector_store  # noqa: E402
+from config import settings  # noqa: E402
+
+
+class StubEmbeddings:
+    """Sleeps `latency + per_text * len(batch)` per call, like one API request."""
+
+    def __init__(self, dimensions: int, latency: float, per_text: float):
+        self.dimensions = dimensions
+        self.latency = latency
+        self.per_text = per_text
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        time.sleep(self.latency + self.per_text * len(texts))
+        return [[random.random() for _ in range(self.dimensions)] for _ in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def synthetic_sections():
+    """An endless document: one section of prose per page."""
+    words = "syllabus module lecture tutorial assessment credit laboratory unit".split()
+    for page in count(1):
+        text = " ".join(random.choice(words) for _ in range(40))
+        yield {"text": f"Section {page}. {text}", "page": page}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.25, help="seconds per embedding request")
+    parser.add_argument("--per-text", type=float, default=0.002, help="extra seconds per text in a request")
+    parser.add_argument("--dimensions", type=int, default=768)
+    args = parser.parse_args()
+
+    stub = StubEmbeddings(args.dimensions, args.latency, args.per_text)
+    ingest_utils.get_embeddings = lambda: stub
+    vector_store.get_embeddings = lambda: stub
+
+    chunks = list(islice(ingest_utils.iter_chunks(synthetic_sections()), args.chunks))
+    documents = ingest_utils.summarise_chunks(
+        chunks,
+        document_id="benchmark",
+        document_name="benchmark.pdf",
+        document_url="",
+        uploader={"email": "benchmark@example.edu"}
+    )
+
+    started = time.perf_counter()
+    written = ingest_utils.create_vector_store(documents, persist_directory=str(SCRATCH / "chroma"))
+    elapsed = time.perf_counter() - started
+
+    print()
+    print(f"chunks              {len(documents)}")
+    print(f"embedded            {written['added']}")
+    print(f"batch size          {settings.EMBED_BATCH_SIZE}")
+    print(f"concurrency         {settings.EMBED_CONCURRENCY}")
+    print(f"embedding requests  {stub.calls}")
+    print(f"wall time           {elapsed:.2f} s")
+    print(f"embeddings/sec      {written['added'] / elapsed:.1f}")
+    print(f"batches/sec         {stub.calls / elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    main()
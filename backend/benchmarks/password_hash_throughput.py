@@ -0,0 +1,158 @@
+"""
+/health latency and login throughput under a burst of password checks.
+
+Serves the real app with uvicorn in a background thread and sends LOGINS
+concurrent requests that each await `averify_password` (the /auth/login
+check) or `ahash_password` (what /auth/register does), so bcrypt runs
+through run_password_hashing on the PASSWORD_HASH_WORKERS pool, exactly
+as in the app. /health is probed every 20 ms until the burst is done and
+compared with its idle latency.
+
+The /auth routes themselves cannot drive this: login's password check is
+commented out and register fails role validation before hashing, so the
+same calls are mounted on the app under /benchmark, in this process only.
+
+PASSWORD_HASH_WORKERS is read at import, so compare pool sizes with one
+run each:
+
+    cd backend
+    python benchmarks/password_hash_throughput.py --logins 64
+    for n in 1 2 4 8 16; do PASSWORD_HASH_WORKERS=$n python benchmarks/password_hash_throughput.py; done
+    BCRYPT_ROUNDS=10 python benchmarks/password_hash_throughput.py --mode register
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("IMAGEKIT_PRIVATE_KEY", "benchmark")
+os.environ.setdefault("IMAGEKIT_PUBLIC_KEY", "benchmark")
+os.environ.setdefault("IMAGEKIT_URL_ENDPOINT", "https://imagekit.invalid")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from fastapi import HTTPException  # noqa: E402
+from pydantic import BaseModel  # noqa: E402
+
+from main import app  # noqa: E402
+from config import settings  # noqa: E402
+from utils.auth import ahash_password, averify_password, hash_password  # noqa: E402
+
+PASSWORD = "correct horse battery staple"
+PROBE_SECONDS = 0.02
+
+
+class _Credentials(BaseModel):
+    password: str
+
+
+def _mount_benchmark_routes(hashed: str):
+    @app.post("/benchmark/login")
+    async def benchmark_login(credentials: _Credentials):
+        if not await averify_password(credentials.password, hashed):
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        return {"ok": True}
+
+    @app.post("/benchmark/register")
+    async def benchmark_register(credentials: _Credentials):
+        await ahash_password(credentials.password)
+        return {"ok": True}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def running_server():
+    """Serves the app from a background thread (lifespan off: no Mongo needed)."""
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(
+        app, host="127.0.0.1", port=port, lifespan="off", log_level="warning"
+    ))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+def _send_burst(base_url: str, path: str, logins: int) -> list:
+    """All requests from one client thread, so clients do not contend with the server for the GIL."""
+    async def send_all():
+        limits = httpx.Limits(max_connections=logins)
+        async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+            return await asyncio.gather(*(
+                client.post(path, json={"password": PASSWORD}) for _ in range(logins)
+            ))
+
+    return asyncio.run(send_all())
+
+
+def _health_latency(client: httpx.Client) -> float:
+    started = time.perf_counter()
+    client.get("/health").raise_for_status()
+    return time.perf_counter() - started
+
+
+def _percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return values[max(0, int(len(values) * fraction) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--mode", choices=["login", "register"], default="login")
+    args = parser.parse_args()
+
+    _mount_benchmark_routes(hash_password(PASSWORD))
+
+    with running_server() as base_url, httpx.Client(base_url=base_url, timeout=30) as client:
+        idle = [_health_latency(client) for _ in range(20)]
+
+        with ThreadPoolExecutor(max_workers=1) as clients:
+            started = time.perf_counter()
+            burst = clients.submit(_send_burst, base_url, f"/benchmark/{args.mode}", args.logins)
+            loaded = []
+            while not burst.done():
+                loaded.append(_health_latency(client))
+                time.sleep(PROBE_SECONDS)
+            responses = burst.result()
+            elapsed = time.perf_counter() - started
+
+    assert all(response.status_code == 200 for response in responses)
+    loaded = loaded or [0.0]
+    ms = 1000
+
+    print()
+    print(f"mode                  {args.mode}")
+    print(f"bcrypt rounds         {settings.BCRYPT_ROUNDS}")
+    print(f"PASSWORD_HASH_WORKERS {settings.PASSWORD_HASH_WORKERS} ({os.cpu_count()} CPUs)")
+    print(f"requests              {args.logins}")
+    print(f"wall time             {elapsed:.2f} s")
+    print(f"requests/sec          {args.logins / elapsed:.1f}")
+    print(f"/health idle p50      {statistics.median(idle) * ms:.2f} ms")
+    print(f"/health loaded p50    {statistics.median(loaded) * ms:.2f} ms")
+    print(f"/health loaded p99    {_percentile(loaded, 0.99) * ms:.2f} ms")
+    print(f"/health loaded max    {max(loaded) * ms:.2f} ms  ({len(loaded)} probes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
 import os
 from dotenv import load_dotenv
 from pathlib import Path
-from google import genai
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -18,6 +17,19 @@ class Settings:
     JWT_SECRET_KEY: str = os.environ.get('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440
+
+    # Verified JWT claims, cached until the token's exp (capped by the TTL)
+    TOKEN_CACHE_SIZE: int = int(os.environ.get("TOKEN_CACHE_SIZE", "4096"))
+    TOKEN_CACHE_TTL_SECONDS: float = float(os.environ.get("TOKEN_CACHE_TTL_SECONDS", "300"))
+
+    # /auth/me profile cache (size 0 disables it)
+    USER_PROFILE_CACHE_SIZE: int = int(os.environ.get("USER_PROFILE_CACHE_SIZE", "1024"))
+    USER_PROFILE_CACHE_TTL_SECONDS: float = float(os.environ.get("USER_PROFILE_CACHE_TTL_SECONDS", "60"))
+
+    # bcrypt cost factor for new hashes (existing hashes keep their own) and
+    # the size of the pool that runs hashing off the event loop
+    BCRYPT_ROUNDS: int = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.environ.get("PASSWORD_HASH_WORKERS", "4"))
     
     # CORS
     CORS_ORIGINS: str = os.environ.get('CORS_ORIGINS', '*')
@@ -28,11 +40,92 @@ class Settings:
     # 🔥 Gemini Configuration
     GEMINI_API_KEY: str = os.environ.get("GOOGLE_API_KEY", "")
     GEMINI_MODEL: str = os.environ.get("GEMINI_MODEL", "gemini-2.5-flash")
+    GEMINI_EMBEDDING_MODEL: str = os.environ.get("GEMINI_EMBEDDING_MODEL", "gemini-embedding-001")
+
+    # Gemini HTTP connection pool limits, applied to every pooled client (utils/llm_clients.py)
+    LLM_MAX_CONNECTIONS: int = int(os.environ.get("LLM_MAX_CONNECTIONS", "32"))
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = int(os.environ.get("LLM_MAX_KEEPALIVE_CONNECTIONS", "16"))
+    LLM_KEEPALIVE_EXPIRY_SECONDS: float = float(os.environ.get("LLM_KEEPALIVE_EXPIRY_SECONDS", "60"))
+    LLM_TIMEOUT_SECONDS: float = float(os.environ.get("LLM_TIMEOUT_SECONDS", "120"))
+
+    # Answer cache for repeated standalone questions
+    ANSWER_CACHE_SIZE: int = int(os.environ.get("ANSWER_CACHE_SIZE", "512"))
+    ANSWER_CACHE_TTL_SECONDS: float = float(os.environ.get("ANSWER_CACHE_TTL_SECONDS", "3600"))
+    ANSWER_CACHE_SIMILARITY: float = float(os.environ.get("ANSWER_CACHE_SIMILARITY", "0.95"))
+
+    # Estimated-token budget for the whole answer prompt; lower-ranked
+    # chunks are truncated or dropped to stay within it
+    PROMPT_TOKEN_BUDGET: int = int(os.environ.get("PROMPT_TOKEN_BUDGET", "6000"))
+
+    # Conversation memory: recent turns within a token budget plus a rolling summary
+    MEMORY_TURNS: int = int(os.environ.get("MEMORY_TURNS", "6"))
+    MEMORY_TOKEN_BUDGET: int = int(os.environ.get("MEMORY_TOKEN_BUDGET", "1500"))
+    MEMORY_SUMMARY_TOKENS: int = int(os.environ.get("MEMORY_SUMMARY_TOKENS", "300"))
+    MEMORY_SUMMARY_BATCH: int = int(os.environ.get("MEMORY_SUMMARY_BATCH", "20"))
+
+    # Admin dashboard stats cache (0 disables it)
+    DASHBOARD_CACHE_TTL_SECONDS: float = float(os.environ.get("DASHBOARD_CACHE_TTL_SECONDS", "30"))
+
+    # Users pulled per Motor batch by /admin/users/export
+    USER_EXPORT_BATCH_SIZE: int = int(os.environ.get("USER_EXPORT_BATCH_SIZE", "1000"))
+
+    # Query embedding cache (set EMBEDDING_CACHE_PATH to keep vectors across restarts)
+    EMBEDDING_CACHE_SIZE: int = int(os.environ.get("EMBEDDING_CACHE_SIZE", "2048"))
+    EMBEDDING_CACHE_PATH: str = os.environ.get("EMBEDDING_CACHE_PATH", "")
+
+    # Background ingestion workers (kept small so ingestion cannot starve queries)
+    INGEST_CONCURRENCY: int = int(os.environ.get("INGEST_CONCURRENCY", "2"))
+    INGEST_BATCH_SIZE: int = int(os.environ.get("INGEST_BATCH_SIZE", "128"))
+    # A running job whose worker has not renewed it for this long is requeued
+    INGEST_JOB_LEASE_SECONDS: float = float(os.environ.get("INGEST_JOB_LEASE_SECONDS", "120"))
+    SUMMARY_CONCURRENCY: int = int(os.environ.get("SUMMARY_CONCURRENCY", "8"))
+
+    # PDFs with at least this many pages are parsed across a process pool
+    PDF_PARALLEL_MIN_PAGES: int = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", "40"))
+    PDF_PAGES_PER_TASK: int = int(os.environ.get("PDF_PAGES_PER_TASK", "16"))
+    PDF_PARSE_WORKERS: int = int(os.environ.get("PDF_PARSE_WORKERS", "0"))  # 0 = CPU count
+
+    # Bulk embedding and vector writes during ingestion
+    EMBED_BATCH_SIZE: int = int(os.environ.get("EMBED_BATCH_SIZE", "32"))
+    EMBED_CONCURRENCY: int = int(os.environ.get("EMBED_CONCURRENCY", "4"))
+    EMBED_MAX_RETRIES: int = int(os.environ.get("EMBED_MAX_RETRIES", "5"))
+    EMBED_BACKOFF_SECONDS: float = float(os.environ.get("EMBED_BACKOFF_SECONDS", "1.0"))
+    CHROMA_WRITE_BATCH_SIZE: int = int(os.environ.get("CHROMA_WRITE_BATCH_SIZE", "256"))
+
+    # Per-chunk summary/embedding cache keyed by chunk content hash
+    CHUNK_CACHE_PATH: str = os.environ.get("CHUNK_CACHE_PATH", str(VECTOR_DB_DIR / "chunk_cache.sqlite3"))
+
+    # HNSW index parameters, applied when a Chroma collection is created.
+    # Higher M / construction_ef build a better graph; higher search_ef
+    # trades query latency for recall. Chroma's own search_ef default is
+    # 100; see benchmarks/hnsw_sweep.py before setting a lower one.
+    HNSW_M: int = int(os.environ.get("HNSW_M", "16"))
+    HNSW_CONSTRUCTION_EF: int = int(os.environ.get("HNSW_CONSTRUCTION_EF", "100"))
+    HNSW_SEARCH_EF: int = int(os.environ.get("HNSW_SEARCH_EF", "0"))  # 0 = Chroma's default
+
+    # Re-ranking: RERANK_CANDIDATES are fetched and the best k chosen by MMR
+    # (MMR_LAMBDA weighs relevance against diversity). Set RERANKER_MODEL,
+    # e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2", to score relevance with
+    # a local cross-encoder (needs sentence-transformers).
+    RERANK_CANDIDATES: int = int(os.environ.get("RERANK_CANDIDATES", "20"))
+    MMR_LAMBDA: float = float(os.environ.get("MMR_LAMBDA", "0.7"))
+    RERANKER_MODEL: str = os.environ.get("RERANKER_MODEL", "")
+
+    # Hybrid retrieval: BM25 index beside Chroma, fused with vector hits by
+    # reciprocal-rank fusion. Questions with codes/numbers whose terms all
+    # appear in some chunk are answered from the lexical index alone.
+    LEXICAL_INDEX_PATH: str = os.environ.get("LEXICAL_INDEX_PATH", str(VECTOR_DB_DIR / "lexical_index.sqlite3"))
+    HYBRID_CANDIDATES: int = int(os.environ.get("HYBRID_CANDIDATES", "20"))
+    RRF_K: int = int(os.environ.get("RRF_K", "60"))
+    LEXICAL_ONLY_ENABLED: bool = os.environ.get("LEXICAL_ONLY_ENABLED", "true").lower() == "true"
+
+    # Worker threads for blocking calls (Chroma, file I/O, sync SDKs)
+    BLOCKING_IO_WORKERS: int = int(os.environ.get("BLOCKING_IO_WORKERS", "16"))
 
     def get_gemini_client(self):
-        if not self.GEMINI_API_KEY:
-            raise ValueError("GEMINI_API_KEY not found in environment variables.")
-        return genai.Client(api_key=self.GEMINI_API_KEY)
+        # Imported lazily: the registry itself reads these settings.
+        from utils.llm_clients import get_genai_client
+        return get_genai_client()
 
 
 settings = Settings()
@@ -1,17 +1,74 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel
 from config import settings
 
 class Database:
     client: AsyncIOMotorClient = None
-    
+
 db = Database()
 
+# Indexes ensured at startup, one entry per query shape the routes run.
+# create_indexes is a no-op for indexes that already exist with the same spec.
+INDEXES = {
+    "query_history": [
+        # /query conversation context: filter conversation + user, newest first
+        IndexModel(
+            [("conversation_id", ASCENDING), ("email", ASCENDING), ("timestamp", DESCENDING)],
+            name="conversation_email_timestamp"
+        ),
+        # /student/history: a user's queries, newest first
+        IndexModel([("email", ASCENDING), ("timestamp", DESCENDING)], name="email_timestamp"),
+        # /admin/dashboard queries_today
+        IndexModel([("timestamp", DESCENDING)], name="timestamp"),
+    ],
+    "conversation_summaries": [
+        IndexModel([("conversation_id", ASCENDING), ("email", ASCENDING)], name="conversation_email", unique=True),
+    ],
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email", unique=True),
+        IndexModel([("id", ASCENDING)], name="id", unique=True),
+        # /admin/users keyset pagination
+        IndexModel([("created_at", ASCENDING), ("id", ASCENDING)], name="created_at_id"),
+    ],
+    "events": [
+        IndexModel([("date", ASCENDING)], name="date"),
+        IndexModel([("category", ASCENDING), ("date", ASCENDING)], name="category_date"),
+        IndexModel([("is_featured", ASCENDING), ("date", ASCENDING)], name="featured_date"),
+    ],
+    "ingest_jobs": [
+        IndexModel([("job_id", ASCENDING)], name="job_id", unique=True),
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created_at"),
+        IndexModel([("content_hash", ASCENDING), ("status", ASCENDING)], name="content_hash_status"),
+        IndexModel([("document_id", ASCENDING), ("status", ASCENDING)], name="document_status"),
+    ],
+    "documents": [
+        IndexModel([("document_id", ASCENDING)], name="document_id", unique=True),
+        IndexModel([("content_hash", ASCENDING)], name="content_hash"),
+    ],
+}
+
 async def get_database():
     return db.client[settings.DB_NAME]
 
+async def ensure_indexes():
+    """
+    Creates every index in INDEXES, one at a time. A failure (e.g.
+    duplicate emails blocking a unique index) is reported and skipped, so
+    the other indexes, including those on the same collection, are still
+    created and startup continues.
+    """
+    database = db.client[settings.DB_NAME]
+    for collection, indexes in INDEXES.items():
+        for index in indexes:
+            try:
+                await database[collection].create_indexes([index])
+            except Exception as e:
+                print(f"❌ Could not create index {index.document['name']} on {collection}: {e}")
+
 async def connect_to_mongo():
     db.client = AsyncIOMotorClient(settings.MONGO_URL)
     print(f"Connected to MongoDB at {settings.MONGO_URL}")
+    await ensure_indexes()
 
 async def close_mongo_connection():
     db.client.close()
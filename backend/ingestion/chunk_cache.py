@@ -0,0 +1,113 @@
+import hashlib
+import sqlite3
+import threading
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from config import settings
+
+
+def content_hash(data) -> str:
+    """SHA-256 hex digest of bytes or text."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class ChunkCache:
+    """
+    SQLite-backed cache of per-chunk ingestion work, keyed by the hash of
+    the chunk text. Re-ingesting a chunk that was seen before (in any
+    document) reuses its AI summary and embedding instead of calling Gemini.
+    """
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS summaries (
+                    chunk_hash TEXT PRIMARY KEY,
+                    summary TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    chunk_hash TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (chunk_hash, model)
+                );
+                CREATE TABLE IF NOT EXISTS chunk_texts (
+                    chunk_hash TEXT PRIMARY KEY,
+                    text TEXT NOT NULL
+                );
+                """
+            )
+            self._conn.commit()
+
+    def get_summary(self, chunk_hash: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary FROM summaries WHERE chunk_hash = ?",
+                (chunk_hash,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_summary(self, chunk_hash: str, summary: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (chunk_hash, summary) VALUES (?, ?)",
+                (chunk_hash, summary)
+            )
+            self._conn.commit()
+
+    def get_text(self, chunk_hash: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text FROM chunk_texts WHERE chunk_hash = ?",
+                (chunk_hash,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_texts(self, texts: Dict[str, str]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunk_texts (chunk_hash, text) VALUES (?, ?)",
+                list(texts.items())
+            )
+            self._conn.commit()
+
+    def get_embeddings(self, chunk_hashes: Iterable[str], model: str) -> Dict[str, List[float]]:
+        hashes = list(set(chunk_hashes))
+        found: Dict[str, List[float]] = {}
+
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(hashes), 500):
+            batch = hashes[start:start + 500]
+            placeholders = ",".join("?" for _ in batch)
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT chunk_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND chunk_hash IN ({placeholders})",
+                    (model, *batch)
+                ).fetchall()
+            for chunk_hash, vector in rows:
+                found[chunk_hash] = array("f", vector).tolist()
+
+        return found
+
+    def set_embeddings(self, vectors: Dict[str, List[float]], model: str):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (chunk_hash, model, vector) VALUES (?, ?, ?)",
+                [
+                    (chunk_hash, model, array("f", vector).tobytes())
+                    for chunk_hash, vector in vectors.items()
+                ]
+            )
+            self._conn.commit()
+
+
+chunk_cache = ChunkCache(settings.CHUNK_CACHE_PATH)
@@ -1,32 +1,143 @@
+import time
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from config import settings
+from ingestion.load_documents import iter_document
+from retrieval.answer_cache import answer_cache
 from .utils import (
-    partition_document,
-    create_chunks_by_title,
+    iter_chunks,
     summarise_chunks,
-    create_vector_store
+    create_vector_store,
+    get_document_chunk_ids,
+    get_fallback_chunk_ids,
+    delete_chunks
 )
 
+STAGES = ["upload", "parse", "chunk", "summarise", "embed"]
+
+
+def _noop_progress(stage: str, status: str, done: int = 0, total: Optional[int] = None):
+    pass
+
+
+def _batched(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
 def ingest_pipeline(
     doc_path: str,
     persist_directory: str,
     document_id: str,
     document_name: str,
     document_url: str,
-    uploader: dict
-):
-    text = partition_document(doc_path)
-    chunks = create_chunks_by_title(text)
-
-    chunks = chunks[:25]
-
-    documents = summarise_chunks(
-        chunks=chunks,
-        document_id=document_id,
-        document_name=document_name,
-        document_url=document_url,
-        uploader=uploader
+    uploader: dict,
+    progress: Optional[Callable] = None,
+    replace: bool = False
+) -> dict:
+    """
+    Ingests every chunk of a document as a stream:
+    parse -> split -> summarise tables -> embed -> write.
+
+    Pages are parsed lazily and chunks move through in batches of
+    INGEST_BATCH_SIZE, so memory stays bounded however large the document.
+    `progress(stage, status, done, total)` is called after each batch.
+
+    With `replace=True` the document is treated as a new version of an
+    already-ingested `document_id`: unchanged chunks keep their vectors,
+    only new or changed chunks are embedded, and chunks that no longer
+    appear are deleted. Chunks whose table summary fell back to raw text
+    last time count as changed, so their summary is retried.
+
+    Returns chunk counts and throughput.
+    """
+    progress = progress or _noop_progress
+    started = time.perf_counter()
+    batch_size = max(1, settings.INGEST_BATCH_SIZE)
+    uploaded_at = int(time.time())
+    sections_parsed = 0
+    chunks_done = 0
+    added = kept = 0
+    summary_fallbacks = 0
+
+    existing_ids = (
+        get_document_chunk_ids(document_id, persist_directory)
+        if replace else set()
+    )
+    # Chunks stored with a fallback summary are summarised and embedded again
+    retry_ids = (
+        get_fallback_chunk_ids(document_id, persist_directory)
+        if replace else set()
     )
+    seen_ids = set()
+
+    def count_sections(sections):
+        nonlocal sections_parsed
+        for section in sections:
+            sections_parsed += 1
+            yield section
+
+    for stage in ("parse", "chunk", "summarise", "embed"):
+        progress(stage, "running")
+
+    sections = count_sections(iter_document(doc_path))
 
-    create_vector_store(
-        documents,
-        persist_directory=persist_directory
+    for batch in _batched(iter_chunks(sections), batch_size):
+        progress("parse", "running", sections_parsed)
+        progress("chunk", "running", chunks_done + len(batch))
+
+        documents = summarise_chunks(
+            chunks=batch,
+            document_id=document_id,
+            document_name=document_name,
+            document_url=document_url,
+            uploader=uploader,
+            start_index=chunks_done,
+            uploaded_at=uploaded_at
+        )
+        progress("summarise", "running", chunks_done + len(documents))
+
+        written = create_vector_store(
+            documents,
+            persist_directory=persist_directory,
+            existing_ids=existing_ids - retry_ids,
+            seen_ids=seen_ids
+        )
+        summary_fallbacks += sum(
+            1 for doc in documents if doc.metadata.get("summary_fallback")
+        )
+        added += written["added"]
+        kept += written["kept"]
+        chunks_done += len(documents)
+        progress("embed", "running", chunks_done)
+
+    removed = delete_chunks(
+        existing_ids - seen_ids,
+        document_id,
+        persist_directory
     )
+    if replace:
+        # Kept chunks may have moved, so cached citations can be stale.
+        answer_cache.invalidate_documents({document_id})
+
+    progress("parse", "completed", sections_parsed, sections_parsed)
+    for stage in ("chunk", "summarise", "embed"):
+        progress(stage, "completed", chunks_done, chunks_done)
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        "chunks": chunks_done,
+        "added": added,
+        "kept": kept,
+        "removed": removed,
+        "summary_fallbacks": summary_fallbacks,
+        "seconds": round(elapsed, 2),
+        "chunks_per_second": round(chunks_done / elapsed, 2) if elapsed > 0 else 0.0
+    }
+    print(f"✅ Ingested {document_name}: {stats}")
+    return stats
@@ -0,0 +1,486 @@
+import asyncio
+import functools
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from config import settings, VECTOR_DB_DIR
+from database import get_database
+from ingestion.ingest_pipeline import ingest_pipeline, STAGES
+from ingestion.load_documents import shutdown_pdf_pool
+from ingestion.utils import backfill_lexical_index, delete_document_chunks
+from retrieval.answer_cache import answer_cache
+from retrieval.lexical_index import lexical_index
+from utils.imagekit_client import upload_document
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ["queued", "running"]
+
+
+def _claim_as_duplicate(claim: dict) -> dict:
+    """A claim whose job is about to be queued, shaped like a queued job."""
+    return {
+        "status": "queued",
+        "job_id": claim["job_id"],
+        "document_id": claim["document_id"],
+        "document_name": claim["document_name"]
+    }
+
+
+class IngestionJobQueue:
+    """
+    Runs document ingestion in the background.
+
+    Job state lives in the `ingest_jobs` collection, so queued and running
+    jobs are picked up again after a restart. Jobs run on a dedicated
+    thread pool of `concurrency` workers, separate from the query path's
+    executor, so ingestion cannot starve query traffic.
+
+    Several processes (e.g. uvicorn workers) can share the collection: a
+    job is claimed atomically before it runs, and a running job renews a
+    lease (`heartbeat_at`) while it works. Only jobs whose lease lapsed,
+    because their process died, are requeued.
+    """
+
+    def __init__(self, concurrency: int):
+        self.concurrency = max(1, concurrency)
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._backfill: Optional[asyncio.Task] = None
+        self._reaper: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency,
+            thread_name_prefix="campusgpt-ingest"
+        )
+        self._workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(self.concurrency)
+        ]
+        if lexical_index.needs_backfill():
+            self._backfill = asyncio.create_task(self._run_blocking(
+                backfill_lexical_index, str(VECTOR_DB_DIR)
+            ))
+        await self._resume_jobs()
+        self._reaper = asyncio.create_task(self._requeue_expired_forever())
+
+    async def stop(self):
+        tasks = self._workers + ([self._reaper] if self._reaper else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._reaper = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        shutdown_pdf_pool()
+
+    async def submit(
+        self,
+        file_path: Path,
+        document_id: str,
+        document_name: str,
+        uploader: dict,
+        content_hash: str,
+        replace: bool = False,
+        job_id: Optional[str] = None
+    ) -> dict:
+        now = datetime.utcnow()
+        job = {
+            "job_id": job_id or str(uuid.uuid4()),
+            "document_id": document_id,
+            "content_hash": content_hash,
+            "mode": "replace" if replace else "new",
+            "document_name": document_name,
+            "document_url": None,
+            "file_path": str(file_path),
+            "uploader": uploader,
+            "status": "queued",
+            "stages": {
+                stage: {"status": "pending", "done": 0, "total": None}
+                for stage in STAGES
+            },
+            "error": None,
+            "created_at": now,
+            "updated_at": now
+        }
+
+        db = await get_database()
+        await db.ingest_jobs.insert_one(dict(job))
+        await self._queue.put(job["job_id"])
+        return job
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        db = await get_database()
+        return await db.ingest_jobs.find_one(
+            {"job_id": job_id},
+            {"_id": 0, "file_path": 0}
+        )
+
+    async def find_duplicate(self, content_hash: str) -> Optional[dict]:
+        """
+        Returns the already-ingested document with this content hash, or
+        the job currently ingesting it, so identical uploads are not
+        processed twice.
+        """
+        db = await get_database()
+
+        document = await db.documents.find_one(
+            {"content_hash": content_hash},
+            {"_id": 0}
+        )
+        if document:
+            return {"status": "completed", **document}
+
+        return await db.ingest_jobs.find_one(
+            {"content_hash": content_hash, "status": {"$in": ACTIVE_STATUSES}},
+            {"_id": 0, "file_path": 0}
+        )
+
+    async def claim_content(
+        self,
+        content_hash: str,
+        job_id: str,
+        document_id: str,
+        document_name: str
+    ) -> Optional[dict]:
+        """
+        Reserves `content_hash` for the new-document job `job_id` before it
+        is submitted, so two concurrent uploads of the same file cannot
+        both be ingested. Returns None when this upload holds the claim,
+        otherwise the duplicate it lost to.
+
+        Claims live in `content_claims` keyed by content hash, so the
+        unique `_id` index decides between concurrent uploads. A claim
+        whose job failed, or whose document has since been replaced with
+        other content, is stale and taken over.
+        """
+        duplicate = await self.find_duplicate(content_hash)
+        if duplicate:
+            return duplicate
+
+        db = await get_database()
+        claim = {
+            "_id": content_hash,
+            "job_id": job_id,
+            "document_id": document_id,
+            "document_name": document_name,
+            "claimed_at": datetime.utcnow()
+        }
+        try:
+            await db.content_claims.insert_one(claim)
+            return None
+        except DuplicateKeyError:
+            pass
+
+        held = await db.content_claims.find_one({"_id": content_hash})
+        if held is None:
+            # Released in between; the next upload can claim it
+            return await self.find_duplicate(content_hash)
+
+        duplicate = await self.find_duplicate(content_hash)
+        if duplicate:
+            return duplicate
+        if not await self._claim_is_stale(held):
+            # Claimed an instant ago; its job is being queued
+            return _claim_as_duplicate(held)
+
+        result = await db.content_claims.replace_one(
+            {"_id": content_hash, "job_id": held["job_id"]},
+            claim
+        )
+        if result.modified_count:
+            return None
+        # Another upload took the stale claim over first
+        held = await db.content_claims.find_one({"_id": content_hash}) or held
+        return _claim_as_duplicate(held)
+
+    async def _claim_is_stale(self, claim: dict) -> bool:
+        db = await get_database()
+        job = await db.ingest_jobs.find_one(
+            {"job_id": claim["job_id"]},
+            {"_id": 0, "status": 1}
+        )
+        if job is None:
+            # The upload that claimed it never queued its job
+            return claim["claimed_at"] < self._lease_cutoff()
+        # Active jobs and ingested documents were ruled out by find_duplicate
+        return job["status"] not in ACTIVE_STATUSES
+
+    async def release_content(self, content_hash: str, job_id: str):
+        """Drops the claim of a new-document job that will not complete."""
+        db = await get_database()
+        await db.content_claims.delete_one({"_id": content_hash, "job_id": job_id})
+
+    async def get_document(self, document_id: str) -> Optional[dict]:
+        db = await get_database()
+        return await db.documents.find_one({"document_id": document_id}, {"_id": 0})
+
+    async def find_active_job(self, document_id: str) -> Optional[dict]:
+        db = await get_database()
+        return await db.ingest_jobs.find_one(
+            {"document_id": document_id, "status": {"$in": ACTIVE_STATUSES}},
+            {"_id": 0, "file_path": 0}
+        )
+
+    async def _resume_jobs(self):
+        db = await get_database()
+        queued = await db.ingest_jobs.find(
+            {"status": "queued"},
+            {"_id": 0, "job_id": 1, "file_path": 1}
+        ).sort("created_at", 1).to_list(None)
+
+        resumed = 0
+        for job in queued:
+            if await self._fail_if_file_lost(job):
+                continue
+            await self._queue.put(job["job_id"])
+            resumed += 1
+
+        resumed += await self._requeue_expired()
+        if resumed:
+            logger.info("Resumed %d ingestion job(s)", resumed)
+
+    def _lease_cutoff(self) -> datetime:
+        return datetime.utcnow() - timedelta(seconds=settings.INGEST_JOB_LEASE_SECONDS)
+
+    async def _fail_if_file_lost(self, job: dict) -> bool:
+        if Path(job["file_path"]).exists():
+            return False
+        await self._update(job["job_id"], {
+            "status": "failed",
+            "error": "Uploaded file was lost before ingestion finished."
+        })
+        return True
+
+    async def _requeue_expired(self) -> int:
+        """Requeues running jobs whose lease lapsed. Returns how many."""
+        db = await get_database()
+        expired = {
+            "status": "running",
+            # Jobs started before leases existed have no heartbeat_at
+            "$or": [
+                {"heartbeat_at": {"$lt": self._lease_cutoff()}},
+                {"heartbeat_at": {"$exists": False}}
+            ]
+        }
+        jobs = await db.ingest_jobs.find(
+            expired,
+            {"_id": 0, "job_id": 1, "file_path": 1}
+        ).to_list(None)
+
+        requeued = 0
+        for job in jobs:
+            # Another process may requeue the same job; only one update wins
+            result = await db.ingest_jobs.update_one(
+                {"job_id": job["job_id"], **expired},
+                {"$set": {"status": "queued", "updated_at": datetime.utcnow()}}
+            )
+            if result.modified_count == 0 or await self._fail_if_file_lost(job):
+                continue
+            await self._queue.put(job["job_id"])
+            requeued += 1
+        return requeued
+
+    async def _requeue_expired_forever(self):
+        while True:
+            await asyncio.sleep(settings.INGEST_JOB_LEASE_SECONDS / 2)
+            try:
+                requeued = await self._requeue_expired()
+                if requeued:
+                    logger.info("Requeued %d ingestion job(s) with an expired lease", requeued)
+            except Exception:
+                logger.exception("Could not requeue expired ingestion jobs")
+
+    async def _claim(self, job_id: str) -> Optional[dict]:
+        """
+        Marks a queued job running and returns it, or None when it is not
+        queued (finished, failed, or already claimed by another worker).
+        """
+        db = await get_database()
+        now = datetime.utcnow()
+        return await db.ingest_jobs.find_one_and_update(
+            {"job_id": job_id, "status": "queued"},
+            {"$set": {
+                "status": "running",
+                "started_at": now,
+                "heartbeat_at": now,
+                "updated_at": now
+            }},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _renew_lease(self, job_id: str):
+        db = await get_database()
+        while True:
+            await asyncio.sleep(settings.INGEST_JOB_LEASE_SECONDS / 4)
+            try:
+                await db.ingest_jobs.update_one(
+                    {"job_id": job_id, "status": "running"},
+                    {"$set": {"heartbeat_at": datetime.utcnow()}}
+                )
+            except Exception as e:
+                logger.warning("Could not renew lease of job %s: %s", job_id, e)
+
+    async def _update(self, job_id: str, fields: dict):
+        db = await get_database()
+        await db.ingest_jobs.update_one(
+            {"job_id": job_id},
+            {"$set": {**fields, "updated_at": datetime.utcnow()}}
+        )
+
+    def _progress_reporter(self, job_id: str):
+        """
+        Returns a callback the pipeline calls from its worker thread. Each
+        update is applied on the event loop before the pipeline continues,
+        so stage updates are stored in order.
+        """
+        def report(stage: str, status: str, done: int = 0, total: Optional[int] = None):
+            future = asyncio.run_coroutine_threadsafe(
+                self._update(job_id, {
+                    f"stages.{stage}": {"status": status, "done": done, "total": total}
+                }),
+                self._loop
+            )
+            try:
+                future.result(timeout=10)
+            except Exception as e:
+                logger.warning("Could not record progress for job %s: %s", job_id, e)
+
+        return report
+
+    async def _run_blocking(self, func, *args, **kwargs):
+        return await self._loop.run_in_executor(
+            self._executor,
+            functools.partial(func, *args, **kwargs)
+        )
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception:
+                logger.exception("Ingestion worker crashed on job %s", job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = await self._claim(job_id)
+        if not job:
+            return
+
+        lease = asyncio.create_task(self._renew_lease(job_id))
+        try:
+            await self._ingest(job)
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back so the next start resumes it
+            await self._update(job_id, {"status": "queued"})
+            raise
+        finally:
+            lease.cancel()
+
+    async def _ingest(self, job: dict):
+        db = await get_database()
+        job_id = job["job_id"]
+        report = self._progress_reporter(job_id)
+        file_path = Path(job["file_path"])
+
+        try:
+            document_url = job.get("document_url")
+            if not document_url:
+                await self._update(job_id, {
+                    "stages.upload": {"status": "running", "done": 0, "total": 1}
+                })
+                upload_result = await self._run_blocking(
+                    upload_document,
+                    file_path=file_path,
+                    folder="campusgpt/documents"
+                )
+                document_url = upload_result["url"]
+                await self._update(job_id, {
+                    "document_url": document_url,
+                    "stages.upload": {"status": "completed", "done": 1, "total": 1}
+                })
+
+            stats = await self._run_blocking(
+                ingest_pipeline,
+                doc_path=str(file_path),
+                persist_directory=str(VECTOR_DB_DIR),
+                document_id=job["document_id"],
+                document_name=job["document_name"],
+                document_url=document_url,
+                uploader=job["uploader"],
+                progress=report,
+                replace=job.get("mode") == "replace"
+            )
+
+            await db.documents.update_one(
+                {"document_id": job["document_id"]},
+                {
+                    "$set": {
+                        "document_id": job["document_id"],
+                        "content_hash": job.get("content_hash"),
+                        "document_name": job["document_name"],
+                        "document_url": document_url,
+                        "chunk_count": stats["chunks"],
+                        "summary_fallbacks": stats["summary_fallbacks"],
+                        "ingested_at": datetime.utcnow()
+                    },
+                    "$setOnInsert": {"uploader": job["uploader"]},
+                    "$inc": {"version": 1}
+                },
+                upsert=True
+            )
+
+            await self._update(job_id, {
+                "status": "completed",
+                "stats": stats,
+                "completed_at": datetime.utcnow()
+            })
+
+        except Exception as e:
+            logger.exception("Ingestion job %s failed", job_id)
+            if job.get("mode") != "replace":
+                # Batches written before the failure belong to a document
+                # that was never recorded; keep them out of search.
+                try:
+                    await self._run_blocking(
+                        delete_document_chunks, job["document_id"], str(VECTOR_DB_DIR)
+                    )
+                except Exception:
+                    logger.exception("Could not remove partial chunks of job %s", job_id)
+                if job.get("content_hash"):
+                    try:
+                        await self.release_content(job["content_hash"], job_id)
+                    except Exception:
+                        logger.exception("Could not release the content claim of job %s", job_id)
+            await self._update(job_id, {"status": "failed", "error": str(e)})
+
+        # Either way chunks were written or removed; other workers' answer
+        # caches only learn about it through the shared generation.
+        try:
+            await answer_cache.bump_generation(db)
+        except Exception:
+            logger.exception("Could not invalidate answer caches after job %s", job_id)
+
+        # Not reached on shutdown cancellation: the file stays so the job
+        # can resume on the next start.
+        if file_path.exists():
+            file_path.unlink()
+
+
+ingestion_queue = IngestionJobQueue(concurrency=settings.INGEST_CONCURRENCY)
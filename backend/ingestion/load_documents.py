@@ -1,8 +1,35 @@
+import multiprocessing
 import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
 from pypdf import PdfReader
 from docx import Document as DocxDocument
 from pptx import Presentation
 
+from config import settings
+
+# A section is {"text": ...} plus its structural position:
+# "page" (PDF), "slide" (PPTX) and "heading" when one is known.
+Section = Dict
+
+
+def _guess_heading(text: str) -> Optional[str]:
+    """
+    Treats a short first line that does not read like a sentence as the
+    heading of a PDF page.
+    """
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if len(line) <= 80 and not line.endswith((".", ",", ";", ":")) and any(c.isalpha() for c in line):
+            return line
+        return None
+    return None
+
 
 def load_document(file_path: str) -> str:
     ext = os.path.splitext(file_path)[1].lower()
@@ -19,14 +46,170 @@ def load_document(file_path: str) -> str:
         raise ValueError(f"Unsupported file type: {ext}")
 
 
-def parse_pdf(file_path: str) -> str:
+def iter_document(file_path: str) -> Iterator[Section]:
+    """
+    Yields a document's text one section at a time (page, paragraph,
+    slide or block), so large files are never held in memory whole.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+
+    if ext == ".pdf":
+        return iter_pdf(file_path)
+    elif ext == ".docx":
+        return iter_docx(file_path)
+    elif ext == ".pptx":
+        return iter_pptx(file_path)
+    elif ext == ".txt":
+        return iter_txt(file_path)
+    else:
+        raise ValueError(f"Unsupported file type: {ext}")
+
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_lock = threading.Lock()
+_pdf_workers = settings.PDF_PARSE_WORKERS or os.cpu_count() or 1
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    """
+    Process pool shared by all ingests. Uses spawn so workers never
+    inherit locks held by the parent's threads.
+    """
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=_pdf_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pdf_pool
+
+
+def shutdown_pdf_pool():
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is not None:
+            _pdf_pool.shutdown(wait=False, cancel_futures=True)
+            _pdf_pool = None
+
+
+def _extract_page_range(file_path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """Runs in a worker process; returns (page_number, text) for pages [start, stop)."""
     reader = PdfReader(file_path)
-    pages = []
+    return [
+        (index + 1, reader.pages[index].extract_text() or "")
+        for index in range(start, stop)
+    ]
+
+
+def iter_pdf(file_path: str) -> Iterator[Section]:
+    """
+    Yields {"text", "page", "heading"} per non-empty page, in page order.
+    A page without a recognisable heading inherits the previous one.
+
+    Large PDFs (at least PDF_PARALLEL_MIN_PAGES pages) are extracted in
+    page ranges across a process pool. A bounded number of ranges is in
+    flight, so memory stays flat however long the document is.
+    """
+    heading = None
+    for page_number, text in _iter_pdf_pages(file_path):
+        if not text:
+            continue
+        heading = _guess_heading(text) or heading
+        section = {"text": text, "page": page_number}
+        if heading:
+            section["heading"] = heading
+        yield section
+
+
+def _iter_pdf_pages(file_path: str) -> Iterator[Tuple[int, str]]:
+    reader = PdfReader(file_path)
+    page_count = len(reader.pages)
+
+    if page_count < settings.PDF_PARALLEL_MIN_PAGES:
+        for index, page in enumerate(reader.pages):
+            yield index + 1, page.extract_text() or ""
+        return
+
+    del reader
+    pool = _get_pdf_pool()
+    step = max(1, settings.PDF_PAGES_PER_TASK)
+    max_in_flight = _pdf_workers * 2
+    ranges = iter(range(0, page_count, step))
+    pending = deque()
+
+    def submit_next():
+        start = next(ranges, None)
+        if start is not None:
+            pending.append(pool.submit(
+                _extract_page_range,
+                file_path,
+                start,
+                min(start + step, page_count)
+            ))
+
+    for _ in range(max_in_flight):
+        submit_next()
+
+    try:
+        while pending:
+            pages = pending.popleft().result()
+            submit_next()
+            yield from pages
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def iter_docx(file_path: str) -> Iterator[Section]:
+    doc = DocxDocument(file_path)
+    heading = None
+
+    for para in doc.paragraphs:
+        if not para.text.strip():
+            continue
+
+        style = para.style.name if para.style is not None else ""
+        if style.startswith("Heading") or style == "Title":
+            heading = para.text.strip()
+
+        section = {"text": para.text}
+        if heading:
+            section["heading"] = heading
+        yield section
 
-    for page in reader.pages:
-        text = page.extract_text()
-        if text:
-            pages.append(text)
+
+def iter_pptx(file_path: str) -> Iterator[Section]:
+    prs = Presentation(file_path)
+
+    for slide_index, slide in enumerate(prs.slides, start=1):
+        slide_lines = [f"Slide {slide_index}:"]
+        for shape in slide.shapes:
+            if hasattr(shape, "text") and shape.text.strip():
+                slide_lines.append(shape.text)
+
+        section = {"text": "\n".join(slide_lines), "slide": slide_index}
+        title = slide.shapes.title
+        if title is not None and title.text.strip():
+            section["heading"] = title.text.strip()
+        yield section
+
+
+def iter_txt(file_path: str) -> Iterator[Section]:
+    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+        paragraph = []
+        for line in f:
+            if line.strip():
+                paragraph.append(line.rstrip("\n"))
+            elif paragraph:
+                yield {"text": "\n".join(paragraph)}
+                paragraph = []
+        if paragraph:
+            yield {"text": "\n".join(paragraph)}
+
+
+def parse_pdf(file_path: str) -> str:
+    pages = [section["text"] for section in iter_pdf(file_path)]
 
     # ✅ RETURN STRING, NOT LIST
     return "\n\n".join(pages)
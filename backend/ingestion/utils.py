@@ -1,38 +1,86 @@
 import json
-from typing import List
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 from dotenv import load_dotenv
 
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_google_genai import (
-    ChatGoogleGenerativeAI,
-    GoogleGenerativeAIEmbeddings
-)
 from langchain_chroma import Chroma
 from langchain_core.messages import HumanMessage
 
-from ingestion.load_documents import load_document
+from config import settings
+from ingestion.chunk_cache import chunk_cache, content_hash
+from utils.llm_clients import get_chat_model, get_embeddings
+from retrieval.answer_cache import answer_cache
+from retrieval.lexical_index import lexical_index
+from retrieval.vector_store import VectorStore
 
 load_dotenv()
 
-def partition_document(file_path: str) -> str:
-    """
-    Loads document content as plain text.
-    """
-    return load_document(file_path)
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 100
+
+# How much section text is buffered before splitting in iter_chunks
+SPLIT_BUFFER_CHARS = CHUNK_SIZE * 40
 
 
-def create_chunks_by_title(text: str) -> List[str]:
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=500,
-        chunk_overlap=100,
+def _make_splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
         separators=["\n\n", "\n", " ", ""]
     )
 
-    chunks = splitter.split_text(text)
-    print(f"✅ Created {len(chunks)} chunks")
-    return chunks
+
+# Section keys copied onto each chunk for citations
+POSITION_KEYS = ("page", "slide", "heading")
+
+
+def _position(section: dict) -> dict:
+    return {key: section[key] for key in POSITION_KEYS if section.get(key) is not None}
+
+
+def iter_chunks(sections: Iterable[dict]) -> Iterator[dict]:
+    """
+    Splits a document's sections into chunks of CHUNK_SIZE characters.
+
+    Yields {"text", ...position} per chunk, where the position is the
+    page, slide and/or heading of the section the chunk came from.
+
+    Consecutive sections at the same position are buffered up to
+    SPLIT_BUFFER_CHARS and split, carrying the last chunk into the next
+    buffer. A new page, slide or heading starts a fresh buffer, so a
+    chunk never spans two positions and its citation stays exact.
+    """
+    splitter = _make_splitter()
+    buffer = ""
+    position: dict = {}
+
+    def split(text: str, at: dict) -> List[dict]:
+        return [{"text": chunk, **at} for chunk in splitter.split_text(text)]
+
+    for section in sections:
+        section_position = _position(section)
+        if buffer and section_position != position:
+            yield from split(buffer, position)
+            buffer = ""
+
+        position = section_position
+        text = section["text"]
+        buffer = f"{buffer}\n\n{text}" if buffer else text
+        if len(buffer) < SPLIT_BUFFER_CHARS:
+            continue
+
+        chunks = split(buffer, position)
+        yield from chunks[:-1]
+        buffer = chunks[-1]["text"] if chunks else ""
+
+    if buffer:
+        yield from split(buffer, position)
 
 def separate_content_types(chunk_text: str) -> dict:
     """
@@ -50,27 +98,22 @@ def separate_content_types(chunk_text: str) -> dict:
         "tables": tables
     }
 
-def create_ai_enhanced_summary(text: str, tables: List[str]) -> str:
-    """
-    Produces an AI-generated searchable summary.
-    Used to improve retrieval recall.
-    """
-    try:
-        llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash")
+def _generate_summary(text: str, tables: List[str]) -> str:
+    llm = get_chat_model()
 
-        prompt = f"""
+    prompt = f"""
 You are creating a searchable description for document retrieval.
 
 TEXT:
 {text}
 """
 
-        if tables:
-            prompt += "\nTABLES:\n"
-            for i, table in enumerate(tables, start=1):
-                prompt += f"Table {i}:\n{table}\n\n"
+    if tables:
+        prompt += "\nTABLES:\n"
+        for i, table in enumerate(tables, start=1):
+            prompt += f"Table {i}:\n{table}\n\n"
 
-        prompt += """
+    prompt += """
 TASK:
 1. Extract key facts and data
 2. Identify main topics
@@ -80,73 +123,353 @@ TASK:
 SEARCHABLE DESCRIPTION:
 """
 
-        response = llm.invoke([HumanMessage(content=prompt)])
-        return response.content
+    response = llm.invoke([HumanMessage(content=prompt)])
+    return response.content
 
+
+# Shared across jobs so concurrent ingests cannot multiply Gemini load
+_summary_executor = ThreadPoolExecutor(
+    max_workers=max(1, settings.SUMMARY_CONCURRENCY),
+    thread_name_prefix="campusgpt-summary"
+)
+
+
+def _summarise_or_fallback(content: dict, chunk_hash: str) -> Tuple[str, bool]:
+    """
+    Returns (summary, fell_back). Only successful summaries are cached;
+    fallbacks are retried the next time the chunk is ingested.
+    """
+    try:
+        summary = _generate_summary(content["text"], content["tables"])
     except Exception as e:
         print(f"❌ AI summary failed: {e}")
-        return text[:300] + "..."
+        return content["text"][:300] + "...", True
+
+    chunk_cache.set_summary(chunk_hash, summary)
+    return summary, False
+
 
 def summarise_chunks(
-    chunks: List[str],
+    chunks: List[dict],
     document_id: str,
     document_name: str,
     document_url: str,
-    uploader: dict
+    uploader: dict,
+    start_index: int = 0,
+    uploaded_at: Optional[int] = None
 ) -> List[Document]:
+    """
+    Builds one Document per chunk from `iter_chunks` output. Table chunks
+    are summarised in parallel (up to SUMMARY_CONCURRENCY at once); a
+    failed summary falls back to truncated text without affecting the
+    rest of the batch.
+
+    `document_type` (file extension) and `uploaded_at` (epoch seconds)
+    are stored for filtered retrieval.
+
+    Chunk text is not repeated in metadata. When page_content is a
+    summary, metadata has `summarised: True` and the original text is
+    kept in the chunk cache under `chunk_hash` (see `get_chunk_text`).
+    `summary_fallback` records whether that summary fell back to
+    truncated text.
+    """
 
-    documents: List[Document] = []
+    contents = [separate_content_types(chunk["text"]) for chunk in chunks]
+    hashes = [content_hash(chunk["text"]) for chunk in chunks]
+
+    summaries = {}
+    for offset, content in enumerate(contents):
+        if not content["tables"]:
+            continue
+        cached = chunk_cache.get_summary(hashes[offset])
+        summaries[offset] = (cached, False) if cached is not None else _summary_executor.submit(
+            _summarise_or_fallback, content, hashes[offset]
+        )
 
-    for idx, chunk in enumerate(chunks):
-        content = separate_content_types(chunk)
+    if summaries:
+        chunk_cache.set_texts({
+            hashes[offset]: contents[offset]["text"] for offset in summaries
+        })
 
-        if content["tables"]:
-            page_content = create_ai_enhanced_summary(
-                content["text"],
-                content["tables"]
-            )
+    document_type = Path(document_name).suffix.lower().lstrip(".")
+    uploaded_at = int(time.time()) if uploaded_at is None else uploaded_at
+
+    documents: List[Document] = []
+
+    for offset, content in enumerate(contents):
+        metadata = {
+            "document_id": document_id,
+            "document_name": document_name,
+            "document_url": document_url,
+            "uploader": uploader["email"],
+            "document_type": document_type,
+            "uploaded_at": uploaded_at,
+            "chunk_index": start_index + offset,
+            "chunk_hash": hashes[offset],
+            **_position(chunks[offset])
+        }
+
+        if offset in summaries:
+            summary = summaries[offset]
+            page_content, fell_back = summary if isinstance(summary, tuple) else summary.result()
+            metadata["summarised"] = True
+            # Set either way: Chroma merges metadata on upsert, so a retried
+            # chunk must clear its old flag explicitly
+            metadata["summary_fallback"] = fell_back
         else:
             page_content = content["text"]
 
-        documents.append(
-            Document(
-                page_content=page_content,
-                metadata={
-                    "document_id": document_id,
-                    "document_name": document_name,
-                    "document_url": document_url,
-                    "uploader": uploader["email"],
-                    "chunk_index": idx,
-
-                    "raw_text": content["text"]
-                }
+        documents.append(Document(page_content=page_content, metadata=metadata))
+
+    return documents
+
+
+def get_chunk_text(metadata: dict, page_content: str) -> str:
+    """
+    Original text of a stored chunk. Only summarised chunks differ from
+    their page_content; their text is looked up by `chunk_hash`.
+    """
+    if not metadata.get("summarised"):
+        return page_content
+    return chunk_cache.get_text(metadata["chunk_hash"]) or page_content
+
+
+def get_vectorstore(persist_directory: str) -> Chroma:
+    """The Chroma handle query-time retrieval uses for this directory."""
+    return VectorStore.get_instance(persist_directory).db
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    message = str(error).lower()
+    return any(
+        marker in message
+        for marker in ("429", "resource_exhausted", "rate limit", "quota")
+    )
+
+
+def _embed_batch_with_backoff(texts: List[str]) -> List[List[float]]:
+    embeddings = get_embeddings()
+
+    for attempt in range(settings.EMBED_MAX_RETRIES + 1):
+        try:
+            return embeddings.embed_documents(texts)
+        except Exception as e:
+            if attempt == settings.EMBED_MAX_RETRIES or not _is_rate_limited(e):
+                raise
+            delay = settings.EMBED_BACKOFF_SECONDS * (2 ** attempt)
+            delay += random.uniform(0, delay / 2)
+            print(f"⏳ Embedding rate limited, retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+# Shared across jobs, so EMBED_CONCURRENCY bounds embedding calls process-wide
+_embed_executor = ThreadPoolExecutor(
+    max_workers=max(1, settings.EMBED_CONCURRENCY),
+    thread_name_prefix="campusgpt-embed"
+)
+
+
+def embed_documents_batched(texts: List[str]) -> List[List[float]]:
+    """
+    Embeds texts in batches of EMBED_BATCH_SIZE with up to
+    EMBED_CONCURRENCY batches in flight across all jobs. Rate-limited
+    batches back off exponentially. Output order matches input order.
+    """
+    batch_size = max(1, settings.EMBED_BATCH_SIZE)
+    batches = [
+        texts[i:i + batch_size]
+        for i in range(0, len(texts), batch_size)
+    ]
+
+    if len(batches) <= 1:
+        return [vector for batch in batches for vector in _embed_batch_with_backoff(batch)]
+
+    results = _embed_executor.map(_embed_batch_with_backoff, batches)
+    return [vector for batch in results for vector in batch]
+
+
+def embed_documents_cached(texts: List[str]) -> List[List[float]]:
+    """
+    Like `embed_documents_batched`, but texts embedded before (by content
+    hash) are served from the chunk cache and only new ones hit Gemini.
+    """
+    model = settings.GEMINI_EMBEDDING_MODEL
+    hashes = [content_hash(text) for text in texts]
+    known = chunk_cache.get_embeddings(hashes, model)
+
+    missing = {}
+    for chunk_hash, text in zip(hashes, texts):
+        if chunk_hash not in known:
+            missing.setdefault(chunk_hash, text)
+
+    if missing:
+        fresh = embed_documents_batched(list(missing.values()))
+        new_vectors = dict(zip(missing.keys(), fresh))
+        chunk_cache.set_embeddings(new_vectors, model)
+        known.update(new_vectors)
+
+    print(f"🔁 Reused {len(texts) - len(missing)} of {len(texts)} embeddings from cache")
+    return [known[chunk_hash] for chunk_hash in hashes]
+
+
+def chunk_id(document_id: str, chunk_hash: str) -> str:
+    """
+    Content-addressed vector ID. A chunk whose text is unchanged keeps its
+    ID across document versions, which is what makes re-ingestion diffable.
+    """
+    return f"{document_id}:{chunk_hash}"
+
+
+def get_document_chunk_ids(document_id: str, persist_directory: str) -> Set[str]:
+    vectorstore = get_vectorstore(persist_directory)
+    result = vectorstore._collection.get(
+        where={"document_id": document_id},
+        include=[]
+    )
+    return set(result["ids"])
+
+
+def get_fallback_chunk_ids(document_id: str, persist_directory: str) -> Set[str]:
+    """Stored chunks of a document whose table summary fell back to raw text."""
+    vectorstore = get_vectorstore(persist_directory)
+    result = vectorstore._collection.get(
+        where={"$and": [{"document_id": document_id}, {"summary_fallback": True}]},
+        include=[]
+    )
+    return set(result["ids"])
+
+
+def delete_chunks(ids: Iterable[str], document_id: str, persist_directory: str) -> int:
+    ids = list(ids)
+    if not ids:
+        return 0
+
+    vectorstore = get_vectorstore(persist_directory)
+    write_batch = max(1, settings.CHROMA_WRITE_BATCH_SIZE)
+    for start in range(0, len(ids), write_batch):
+        vectorstore._collection.delete(ids=ids[start:start + write_batch])
+    lexical_index.delete(ids)
+
+    answer_cache.invalidate_documents({document_id})
+    return len(ids)
+
+
+def delete_document_chunks(document_id: str, persist_directory: str) -> int:
+    """Removes every stored chunk of a document from Chroma and BM25."""
+    return delete_chunks(
+        get_document_chunk_ids(document_id, persist_directory),
+        document_id,
+        persist_directory
+    )
+
+
+def _lexical_text(doc: Document) -> str:
+    """Summarised chunks are indexed with their original text as well."""
+    text = get_chunk_text(doc.metadata, doc.page_content)
+    if text == doc.page_content:
+        return text
+    return f"{text}\n{doc.page_content}"
+
+
+def backfill_lexical_index(persist_directory: str, page_size: int = 1000) -> int:
+    """
+    Indexes every chunk already in Chroma into the BM25 index. Used for
+    vector stores built before the lexical index existed, or before it
+    stored chunk metadata.
+    """
+    vectorstore = get_vectorstore(persist_directory)
+    indexed = 0
+    offset = 0
+    while True:
+        result = vectorstore._collection.get(
+            include=["documents", "metadatas"],
+            limit=page_size,
+            offset=offset
+        )
+        if not result["ids"]:
+            break
+        lexical_index.upsert(
+            (chunk_id, _lexical_text(Document(page_content=text, metadata=metadata or {})), metadata or {})
+            for chunk_id, text, metadata in zip(
+                result["ids"], result["documents"], result["metadatas"]
             )
         )
+        indexed += len(result["ids"])
+        offset += page_size
 
-    return documents
+    print(f"✅ Lexical index backfilled with {indexed} chunks")
+    return indexed
 
 
 def create_vector_store(
     documents: List[Document],
-    persist_directory: str
-):
+    persist_directory: str,
+    existing_ids: Optional[Set[str]] = None,
+    seen_ids: Optional[Set[str]] = None
+) -> Dict[str, int]:
     """
     Adds documents to a persistent Chroma vector store.
-    Safe for repeated ingestion.
+    Safe for repeated ingestion: IDs are content-addressed, so re-running
+    a job overwrites rather than duplicates.
+
+    Chunks whose ID is in `existing_ids` are already stored with the same
+    text, so only their metadata (e.g. chunk_index) is refreshed and
+    nothing is re-embedded. IDs are added to `seen_ids` so the caller can
+    find chunks that disappeared; a repeated chunk text is stored once.
     """
     print("🔮 Creating / updating vector store")
 
-    embeddings = GoogleGenerativeAIEmbeddings(
-        model="gemini-embedding-001"
-    )
+    existing_ids = existing_ids if existing_ids is not None else set()
+    seen_ids = seen_ids if seen_ids is not None else set()
+    vectorstore = get_vectorstore(persist_directory)
+
+    new_docs, new_ids, kept_docs, kept_ids = [], [], [], []
+    for doc in documents:
+        doc_id = chunk_id(doc.metadata["document_id"], doc.metadata["chunk_hash"])
+        if doc_id in seen_ids:
+            continue
+        seen_ids.add(doc_id)
+
+        if doc_id in existing_ids:
+            kept_docs.append(doc)
+            kept_ids.append(doc_id)
+        else:
+            new_docs.append(doc)
+            new_ids.append(doc_id)
 
-    vectorstore = Chroma(
-        persist_directory=persist_directory,
-        embedding_function=embeddings,
-        collection_metadata={"hnsw:space": "cosine"}
+    write_batch = max(1, settings.CHROMA_WRITE_BATCH_SIZE)
+
+    for start in range(0, len(kept_docs), write_batch):
+        vectorstore._collection.update(
+            ids=kept_ids[start:start + write_batch],
+            metadatas=[doc.metadata for doc in kept_docs[start:start + write_batch]]
+        )
+    # Keeps BM25 filters (e.g. uploaded_at) in step with Chroma
+    lexical_index.update_metadata(
+        (doc_id, doc.metadata) for doc_id, doc in zip(kept_ids, kept_docs)
     )
 
-    vectorstore.add_documents(documents)
+    if new_docs:
+        vectors = embed_documents_cached(
+            [doc.page_content for doc in new_docs]
+        )
+
+        for start in range(0, len(new_docs), write_batch):
+            batch = new_docs[start:start + write_batch]
+            vectorstore._collection.upsert(
+                ids=new_ids[start:start + write_batch],
+                embeddings=vectors[start:start + write_batch],
+                documents=[doc.page_content for doc in batch],
+                metadatas=[doc.metadata for doc in batch]
+            )
+
+        lexical_index.upsert(
+            (doc_id, _lexical_text(doc), doc.metadata) for doc_id, doc in zip(new_ids, new_docs)
+        )
+
+        answer_cache.invalidate_documents(
+            {doc.metadata["document_id"] for doc in new_docs}
+        )
 
     print(f"✅ Vector store updated at {persist_directory}")
-    return vectorstore
+    return {"added": len(new_docs), "kept": len(kept_docs)}
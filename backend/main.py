@@ -4,6 +4,9 @@ import logging
 
 from config import settings, UPLOADS_DIR, VECTOR_DB_DIR
 from database import connect_to_mongo, close_mongo_connection
+from utils.concurrency import shutdown_executor
+from utils.llm_clients import aclose_clients
+from ingestion.job_queue import ingestion_queue
 from routes import (
     auth_router,
     student_router,
@@ -47,11 +50,15 @@ app.add_middleware(
 @app.on_event("startup")
 async def startup_db_client():
     await connect_to_mongo()
+    await ingestion_queue.start()
     logger.info("Application started successfully")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await ingestion_queue.stop()
     await close_mongo_connection()
+    await aclose_clients()
+    shutdown_executor()
     logger.info("Application shutdown")
 
 # Include routers
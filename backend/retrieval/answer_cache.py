@@ -0,0 +1,164 @@
+import re
+import threading
+from typing import Iterable, List, Optional
+
+import numpy as np
+from pymongo import ReturnDocument
+
+from config import settings
+from utils.cache import TTLCache
+
+
+def normalize_question(question: str) -> str:
+    """Lowercases, drops punctuation and collapses whitespace."""
+    text = re.sub(r"[^\w\s]", " ", question.lower())
+    return " ".join(text.split())
+
+
+class AnswerCache:
+    """
+    Caches final answers for standalone (non follow-up) questions.
+
+    Lookups first match on normalized question text, then on embedding
+    similarity above `similarity_threshold`. Entries remember which
+    documents their chunks came from so ingestion can invalidate them.
+
+    Each process keeps its own entries. With several workers, the one that
+    ran an ingestion job only invalidates its own cache, so every job also
+    bumps a corpus generation stored in Mongo (`bump_generation`). Workers
+    read it on each lookup (`sync_generation`) and drop all their entries
+    once it has moved.
+    """
+
+    STATE_ID = "answer_cache"
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: float,
+        similarity_threshold: float
+    ):
+        self.similarity_threshold = similarity_threshold
+        self._entries = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._lock = threading.Lock()
+        self.semantic_hits = 0
+        self.generation = 0
+
+    def _adopt_generation(self, generation: int):
+        with self._lock:
+            if generation != self.generation:
+                self.generation = generation
+                self._entries.clear()
+
+    async def sync_generation(self, db) -> int:
+        """
+        Catches up with the corpus generation in Mongo and returns it. Pass
+        the result to `set`, so an answer built before a change is not
+        stored after it.
+        """
+        state = await db.corpus_state.find_one({"_id": self.STATE_ID}, {"generation": 1})
+        self._adopt_generation(state["generation"] if state else 0)
+        return self.generation
+
+    async def bump_generation(self, db):
+        """Invalidates every worker's cache after the corpus changed."""
+        state = await db.corpus_state.find_one_and_update(
+            {"_id": self.STATE_ID},
+            {"$inc": {"generation": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self._adopt_generation(state["generation"])
+
+    def get(self, question: str) -> Optional[dict]:
+        entry = self._entries.get(normalize_question(question))
+        return entry["payload"] if entry else None
+
+    def get_similar(self, embedding: List[float]) -> Optional[dict]:
+        """
+        Semantic lookup, made after `get` missed. It does not touch the
+        exact-match counters; `stats` turns that miss into a hit instead.
+        """
+        entries = [
+            (key, entry) for key, entry in self._entries.items()
+            if entry["embedding"] is not None
+        ]
+        if not entries:
+            return None
+
+        query = np.asarray(embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query)
+        if query_norm == 0:
+            return None
+
+        matrix = np.stack([entry["embedding"] for _, entry in entries])
+        scores = matrix @ (query / query_norm)
+        best = int(np.argmax(scores))
+
+        if scores[best] < self.similarity_threshold:
+            return None
+
+        key, entry = entries[best]
+        self._entries.touch(key)
+
+        with self._lock:
+            self.semantic_hits += 1
+        return entry["payload"]
+
+    def set(
+        self,
+        question: str,
+        payload: dict,
+        document_ids: Iterable[str],
+        embedding: Optional[List[float]] = None,
+        generation: Optional[int] = None
+    ):
+        normalized = None
+        if embedding is not None:
+            vector = np.asarray(embedding, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                normalized = vector / norm
+
+        with self._lock:
+            # The corpus changed while this answer was being built
+            if generation is not None and generation != self.generation:
+                return
+            self._entries.set(normalize_question(question), {
+                "payload": payload,
+                "embedding": normalized,
+                "document_ids": frozenset(document_ids)
+            })
+
+    def invalidate_documents(self, document_ids: Iterable[str]):
+        """
+        Drops entries built from any of `document_ids`. Entries that had no
+        supporting documents are dropped too, since new content may now
+        answer them.
+        """
+        changed = set(document_ids)
+        for key, entry in self._entries.items():
+            if not entry["document_ids"] or entry["document_ids"] & changed:
+                self._entries.pop(key)
+
+    def stats(self) -> dict:
+        stats = self._entries.stats()
+        # Every semantic hit followed an exact-match miss for the same question
+        hits = stats["hits"] + self.semantic_hits
+        misses = stats["misses"] - self.semantic_hits
+        lookups = hits + misses
+        return {
+            **stats,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "semantic_hits": self.semantic_hits,
+            "generation": self.generation
+        }
+
+
+answer_cache = AnswerCache(
+    max_size=settings.ANSWER_CACHE_SIZE,
+    ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+    similarity_threshold=settings.ANSWER_CACHE_SIMILARITY
+)
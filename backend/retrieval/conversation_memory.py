@@ -0,0 +1,181 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.messages import HumanMessage
+
+from config import settings
+from utils.llm_clients import get_chat_model
+from utils.tokens import estimate_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+_TURN_PROJECTION = {"_id": 0, "question": 1, "answer": 1, "timestamp": 1}
+
+
+def _format_turn(turn: dict) -> str:
+    return f"User: {turn['question']}\nAssistant: {turn['answer']}\n"
+
+
+class ConversationMemory:
+    """
+    Builds the conversation context for a prompt at a bounded size.
+
+    The latest `max_turns` turns are fetched (newest first, projected to
+    the fields the prompt needs) and kept while they fit in
+    `token_budget`. Turns that do not make it into the prompt, whether
+    outside that window or cut by the budget, are folded into a rolling
+    summary stored in `conversation_summaries`, so context stays roughly
+    constant in size however long a session runs.
+
+    The summary is only refreshed when `load` finds such turns, in the
+    background and at most `summary_batch` turns per LLM call. `load`
+    only runs for follow-up questions, so standalone questions never
+    cost a summarisation call.
+    """
+
+    def __init__(
+        self,
+        max_turns: int,
+        token_budget: int,
+        summary_tokens: int,
+        summary_batch: int
+    ):
+        self.max_turns = max(1, max_turns)
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.summary_batch = max(1, summary_batch)
+        self._summarising: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    @staticmethod
+    def _key(conversation_id: str, email: str) -> dict:
+        return {"conversation_id": conversation_id, "email": email}
+
+    async def _recent_turns(self, db, conversation_id: str, email: str) -> List[dict]:
+        return await db.query_history.find(
+            self._key(conversation_id, email),
+            _TURN_PROJECTION
+        ).sort("timestamp", -1).limit(self.max_turns).to_list(self.max_turns)
+
+    async def load(self, db, conversation_id: str, email: str) -> str:
+        turns, summary_doc = await asyncio.gather(
+            self._recent_turns(db, conversation_id, email),
+            db.conversation_summaries.find_one(
+                self._key(conversation_id, email),
+                {"_id": 0, "summary": 1, "summarised_until": 1}
+            )
+        )
+
+        summary_doc = summary_doc or {}
+        summary = summary_doc.get("summary", "")
+        summarised_until = summary_doc.get("summarised_until")
+        remaining = self.token_budget - estimate_tokens(summary)
+
+        kept: List[str] = []
+        # Timestamp of the oldest turn in the prompt; older turns can only
+        # reach the model through the summary
+        context_start: Optional[datetime] = None
+        # Whether turns older than context_start may still need summarising
+        unsummarised = len(turns) == self.max_turns
+        for turn in turns:
+            if summarised_until is not None and turn["timestamp"] <= summarised_until:
+                # Already covered by the summary
+                unsummarised = False
+                break
+            text = _format_turn(turn)
+            cost = estimate_tokens(text)
+            if cost > remaining:
+                # The newest turn matters most, so it is shortened rather than dropped
+                if not kept and remaining > 0:
+                    kept.append(truncate_to_tokens(text, remaining) + "\n")
+                    context_start = turn["timestamp"]
+                unsummarised = True
+                break
+            kept.append(text)
+            remaining -= cost
+            context_start = turn["timestamp"]
+
+        if unsummarised:
+            # With no turn kept, every unsummarised turn is out of the prompt
+            self.schedule_summary(db, conversation_id, email, context_start or datetime.max)
+
+        context = "".join(reversed(kept))
+        if summary:
+            context = f"Summary of earlier conversation:\n{summary}\n\n{context}"
+        return context
+
+    def schedule_summary(self, db, conversation_id: str, email: str, before: datetime):
+        """
+        Starts a background refresh that folds unsummarised turns older
+        than `before` into the summary, unless one is already running for
+        this conversation.
+        """
+        key = (conversation_id, email)
+        running = self._summarising.get(key)
+        if running is not None and not running.done():
+            return
+
+        task = asyncio.create_task(self._update_summary(db, conversation_id, email, before))
+        self._summarising[key] = task
+        task.add_done_callback(lambda _: self._summarising.pop(key, None))
+
+    async def _update_summary(self, db, conversation_id: str, email: str, before: datetime):
+        try:
+            summary_doc = await db.conversation_summaries.find_one(
+                self._key(conversation_id, email),
+                {"_id": 0}
+            ) or {}
+            since = summary_doc.get("summarised_until", datetime.min)
+
+            older = await db.query_history.find(
+                {
+                    **self._key(conversation_id, email),
+                    "timestamp": {"$gt": since, "$lt": before}
+                },
+                _TURN_PROJECTION
+            ).sort("timestamp", 1).limit(self.summary_batch).to_list(self.summary_batch)
+            if not older:
+                return
+
+            summary = await self._summarise(summary_doc.get("summary", ""), older)
+
+            await db.conversation_summaries.update_one(
+                self._key(conversation_id, email),
+                {"$set": {
+                    "summary": summary,
+                    "summarised_until": older[-1]["timestamp"],
+                    "updated_at": datetime.utcnow()
+                }},
+                upsert=True
+            )
+        except Exception:
+            # The turns stay unsummarised and are retried on the next load
+            logger.exception("Conversation summary update failed for %s", conversation_id)
+
+    async def _summarise(self, previous: str, turns: List[dict]) -> str:
+        transcript = "".join(_format_turn(turn) for turn in turns)
+        prompt = f"""
+Update the running summary of a conversation between a student and CampusGPT.
+Keep facts, names, numbers and open questions the user may refer back to.
+Write at most {self.summary_tokens * 3 // 4} words of plain prose.
+
+CURRENT SUMMARY:
+{previous or "(none)"}
+
+NEW TURNS:
+{transcript}
+
+UPDATED SUMMARY:
+"""
+        llm = get_chat_model(temperature=0)
+        response = await llm.ainvoke([HumanMessage(content=prompt)])
+        return truncate_to_tokens(response.content.strip(), self.summary_tokens)
+
+
+conversation_memory = ConversationMemory(
+    max_turns=settings.MEMORY_TURNS,
+    token_budget=settings.MEMORY_TOKEN_BUDGET,
+    summary_tokens=settings.MEMORY_SUMMARY_TOKENS,
+    summary_batch=settings.MEMORY_SUMMARY_BATCH
+)
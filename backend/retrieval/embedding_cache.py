@@ -0,0 +1,111 @@
+import hashlib
+import sqlite3
+import threading
+from array import array
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from config import settings
+from utils.cache import TTLCache
+
+
+class EmbeddingCache:
+    """
+    Query text -> embedding vector cache.
+
+    An in-memory LRU sits in front of an optional SQLite file, so vectors
+    survive restarts when `disk_path` is set.
+    """
+
+    def __init__(self, max_size: int, disk_path: Optional[str] = None):
+        self._memory = TTLCache(max_size=max_size, ttl_seconds=float("inf"))
+        self._lock = threading.Lock()
+        self._conn = None
+        self.disk_hits = 0
+        self.misses = 0
+
+        if disk_path:
+            Path(disk_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(disk_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def _key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+    def _read_disk(self, key: str) -> Optional[List[float]]:
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vector FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return array("f", row[0]).tolist()
+
+    def _write_disk(self, key: str, vector: List[float]):
+        if self._conn is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                (key, array("f", vector).tobytes())
+            )
+            self._conn.commit()
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        key = self._key(model, text)
+
+        vector = self._memory.get(key)
+        if vector is not None:
+            return vector
+
+        vector = self._read_disk(key)
+        if vector is not None:
+            self.disk_hits += 1
+            self._memory.set(key, vector)
+            return vector
+
+        self.misses += 1
+        return None
+
+    def set(self, model: str, text: str, vector: List[float]):
+        key = self._key(model, text)
+        self._memory.set(key, vector)
+        self._write_disk(key, vector)
+
+    def get_or_compute(
+        self,
+        model: str,
+        text: str,
+        compute: Callable[[str], List[float]]
+    ) -> List[float]:
+        vector = self.get(model, text)
+        if vector is None:
+            vector = compute(text)
+            self.set(model, text, vector)
+        return vector
+
+    def stats(self) -> dict:
+        memory = self._memory.stats()
+        lookups = memory["hits"] + self.disk_hits + self.misses
+        return {
+            "size": memory["size"],
+            "max_size": memory["max_size"],
+            "memory_hits": memory["hits"],
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((lookups - self.misses) / lookups, 4) if lookups else 0.0,
+            "disk_enabled": self._conn is not None
+        }
+
+
+embedding_cache = EmbeddingCache(
+    max_size=settings.EMBEDDING_CACHE_SIZE,
+    disk_path=settings.EMBEDDING_CACHE_PATH or None
+)
@@ -1,8 +1,37 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
+import json
+import re
+from typing import AsyncIterator, Tuple, Union
+
 from langchain_core.messages import HumanMessage
+from langchain_core.utils.json import parse_partial_json
 
 from retrieval.prompt_builder import build_structured_prompt
 from schemas.structured_output import StructuredRAGAnswer
+from utils.llm_clients import get_chat_model
+
+
+_structured_llm = None
+
+
+def get_structured_llm():
+    """The structured-output runnable is built once and shared."""
+    global _structured_llm
+    if _structured_llm is None:
+        llm = get_chat_model(temperature=0)
+        _structured_llm = llm.with_structured_output(StructuredRAGAnswer)
+    return _structured_llm
+
+
+def _build_request(chunks, query: str, conversation_context: str):
+    structured_llm = get_structured_llm()
+
+    prompt_text = build_structured_prompt(
+        chunks=chunks,
+        query=query,
+        conversation_context=conversation_context
+    )
+
+    return structured_llm, [HumanMessage(content=prompt_text)]
 
 
 def generate_final_answer(
@@ -11,21 +40,84 @@ def generate_final_answer(
     conversation_context: str = ""
 ) -> StructuredRAGAnswer:
 
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        temperature=0
+    structured_llm, messages = _build_request(
+        chunks, query, conversation_context
+    )
+
+    response: StructuredRAGAnswer = structured_llm.invoke(messages)
+
+    return response
+
+
+async def agenerate_final_answer(
+    chunks,
+    query: str,
+    conversation_context: str = ""
+) -> StructuredRAGAnswer:
+    """
+    Async variant of `generate_final_answer` using the model's native
+    async client.
+    """
+
+    structured_llm, messages = _build_request(
+        chunks, query, conversation_context
+    )
+
+    response: StructuredRAGAnswer = await structured_llm.ainvoke(messages)
+
+    return response
+
+
+def _strip_code_fence(text: str) -> str:
+    text = re.sub(r"^\s*```(?:json)?", "", text)
+    return re.sub(r"```\s*$", "", text).strip()
+
+
+def _parse_streamed_answer(text: str) -> StructuredRAGAnswer:
+    cleaned = _strip_code_fence(text)
+    start = cleaned.find("{")
+    end = cleaned.rfind("}")
+
+    if start == -1 or end == -1:
+        raise ValueError("No valid JSON found in Gemini response.")
+
+    return StructuredRAGAnswer.model_validate(
+        json.loads(cleaned[start:end + 1])
     )
 
-    structured_llm = llm.with_structured_output(StructuredRAGAnswer)
 
+async def astream_final_answer(
+    chunks,
+    query: str,
+    conversation_context: str = ""
+) -> AsyncIterator[Tuple[str, Union[str, StructuredRAGAnswer]]]:
+    """
+    Streams the answer as Gemini produces it.
+
+    Yields ("token", text) for each new piece of the `answer` field, then
+    one ("answer", StructuredRAGAnswer) once the full JSON has arrived.
+    The prompt is the same one `generate_final_answer` uses.
+    """
+
+    llm = get_chat_model(temperature=0)
     prompt_text = build_structured_prompt(
         chunks=chunks,
         query=query,
         conversation_context=conversation_context
     )
 
-    response: StructuredRAGAnswer = structured_llm.invoke(
-        [HumanMessage(content=prompt_text)]
-    )
+    buffer = ""
+    sent = 0
 
-    return response
+    async for chunk in llm.astream([HumanMessage(content=prompt_text)]):
+        buffer += chunk.text
+        partial = parse_partial_json(_strip_code_fence(buffer))
+        if not isinstance(partial, dict):
+            continue
+
+        answer_so_far = partial.get("answer")
+        if isinstance(answer_so_far, str) and len(answer_so_far) > sent:
+            yield "token", answer_so_far[sent:]
+            sent = len(answer_so_far)
+
+    yield "answer", _parse_streamed_answer(buffer)
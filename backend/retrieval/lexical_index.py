@@ -0,0 +1,231 @@
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import settings
+
+# Words too common to carry lexical signal in campus questions
+STOPWORDS = frozenset("""
+a an and are as at be by can did do does for from how i in is it me my of on
+or please tell that the their there this to was what when where which who why
+will with you your about any give show list
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        token for token in re.findall(r"\w+", text.lower())
+        if token not in STOPWORDS
+    ]
+
+
+def exact_tokens(text: str) -> List[str]:
+    """
+    Identifier-like tokens: subject codes ("SPCC"), room numbers ("B-204"
+    gives "b", "204"), dates. These are where embeddings are weakest.
+    """
+    tokens = []
+    for word in re.findall(r"[\w-]+", text):
+        if any(c.isdigit() for c in word) or (len(word) >= 2 and word.isupper()):
+            tokens.extend(re.findall(r"\w+", word.lower()))
+    return list(dict.fromkeys(tokens))
+
+
+def _phrase(token: str) -> str:
+    return '"' + token.replace('"', "") + '"'
+
+
+# Chunk metadata stored next to each chunk, for filtering in SQL
+FILTER_COLUMNS = ("document_id", "uploader", "document_type", "uploaded_at")
+
+_OPERATORS = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+def _where_sql(where: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """
+    Translates a Chroma `where` clause (as built by `build_where`) over
+    FILTER_COLUMNS into SQL on chunk_ids, so filtered searches rank only
+    matching chunks.
+    """
+    if len(where) != 1:
+        return _where_sql({"$and": [{key: value} for key, value in where.items()]})
+
+    key, value = next(iter(where.items()))
+    if key in ("$and", "$or"):
+        parts = [_where_sql(condition) for condition in value]
+        joiner = " AND " if key == "$and" else " OR "
+        sql = joiner.join(f"({part})" for part, _ in parts)
+        return sql, [param for _, params in parts for param in params]
+
+    if key not in FILTER_COLUMNS:
+        raise ValueError(f"Lexical index cannot filter on {key!r}")
+
+    column = f"chunk_ids.{key}"
+    if not isinstance(value, dict):
+        return f"{column} = ?", [value]
+
+    (operator, operand), = value.items()
+    if operator in ("$in", "$nin"):
+        placeholders = ", ".join("?" for _ in operand)
+        negation = "NOT " if operator == "$nin" else ""
+        return f"{column} {negation}IN ({placeholders})", list(operand)
+    if operator not in _OPERATORS:
+        raise ValueError(f"Lexical index does not support {operator!r}")
+    return f"{column} {_OPERATORS[operator]} ?", [operand]
+
+
+class LexicalIndex:
+    """
+    BM25 index over chunk text, kept next to Chroma and keyed by the same
+    chunk IDs. Backed by SQLite FTS5, whose bm25() ranking runs over an
+    inverted index, so lookups need no embedding call.
+    """
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            # FTS rows share their rowid with chunk_ids, so replacing or
+            # deleting a chunk is a primary-key lookup, not a scan.
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS chunk_ids (
+                    rowid INTEGER PRIMARY KEY,
+                    chunk_id TEXT NOT NULL UNIQUE
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5(
+                    content,
+                    tokenize = 'unicode61'
+                );
+                """
+            )
+            # Indexes built before metadata filtering lack these columns;
+            # their rows stay NULL until `backfill_lexical_index` runs.
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(chunk_ids)")}
+            for column in FILTER_COLUMNS:
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE chunk_ids ADD COLUMN {column}")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS chunk_ids_document_id ON chunk_ids (document_id)"
+            )
+            self._conn.commit()
+
+    def _delete_locked(self, chunk_ids: Iterable[str]):
+        for chunk_id in chunk_ids:
+            row = self._conn.execute(
+                "SELECT rowid FROM chunk_ids WHERE chunk_id = ?", (chunk_id,)
+            ).fetchone()
+            if row is not None:
+                self._conn.execute("DELETE FROM chunks WHERE rowid = ?", row)
+                self._conn.execute("DELETE FROM chunk_ids WHERE rowid = ?", row)
+
+    def upsert(self, entries: Iterable[Tuple[str, str, dict]]):
+        """
+        Indexes (chunk_id, text, metadata) triples, replacing any earlier
+        text. FILTER_COLUMNS are taken from the chunk metadata.
+        """
+        entries = list(entries)
+        if not entries:
+            return
+        with self._lock:
+            self._delete_locked(chunk_id for chunk_id, _, _ in entries)
+            for chunk_id, text, metadata in entries:
+                rowid = self._conn.execute(
+                    "INSERT INTO chunk_ids (chunk_id, document_id, uploader, document_type, uploaded_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (chunk_id, *(metadata.get(column) for column in FILTER_COLUMNS))
+                ).lastrowid
+                self._conn.execute(
+                    "INSERT INTO chunks (rowid, content) VALUES (?, ?)",
+                    (rowid, text)
+                )
+            self._conn.commit()
+
+    def update_metadata(self, entries: Iterable[Tuple[str, dict]]):
+        """
+        Refreshes FILTER_COLUMNS for (chunk_id, metadata) pairs whose text
+        is unchanged, without rewriting the full-text index.
+        """
+        entries = list(entries)
+        if not entries:
+            return
+        assignments = ", ".join(f"{column} = ?" for column in FILTER_COLUMNS)
+        with self._lock:
+            self._conn.executemany(
+                f"UPDATE chunk_ids SET {assignments} WHERE chunk_id = ?",
+                [
+                    (*(metadata.get(column) for column in FILTER_COLUMNS), chunk_id)
+                    for chunk_id, metadata in entries
+                ]
+            )
+            self._conn.commit()
+
+    def delete(self, chunk_ids: Iterable[str]):
+        with self._lock:
+            self._delete_locked(chunk_ids)
+            self._conn.commit()
+
+    def needs_backfill(self) -> bool:
+        """True when empty or when some chunks were indexed without metadata."""
+        with self._lock:
+            return bool(self._conn.execute(
+                "SELECT NOT EXISTS (SELECT 1 FROM chunk_ids) "
+                "OR EXISTS (SELECT 1 FROM chunk_ids WHERE document_id IS NULL)"
+            ).fetchone()[0])
+
+    def _match(
+        self,
+        expression: str,
+        k: int,
+        where: Optional[dict] = None
+    ) -> List[Tuple[str, float]]:
+        sql = (
+            "SELECT chunk_ids.chunk_id, bm25(chunks) AS score "
+            "FROM chunks JOIN chunk_ids ON chunk_ids.rowid = chunks.rowid "
+            "WHERE chunks MATCH ?"
+        )
+        params: List[Any] = [expression]
+        if where:
+            condition, condition_params = _where_sql(where)
+            sql += f" AND ({condition})"
+            params.extend(condition_params)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(k)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        # FTS5 bm25() is negative, lower is better; flip it so higher is better
+        return [(chunk_id, -score) for chunk_id, score in rows]
+
+    def search(self, query: str, k: int, where: Optional[dict] = None) -> List[Tuple[str, float]]:
+        """
+        Best `k` chunks containing any query term, by BM25, among chunks
+        matching `where` (a Chroma-style clause over FILTER_COLUMNS).
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        return self._match(" OR ".join(_phrase(t) for t in terms), k, where)
+
+    def search_all_terms(
+        self,
+        query: str,
+        k: int,
+        where: Optional[dict] = None
+    ) -> List[Tuple[str, float]]:
+        """Best `k` chunks containing every query term, by BM25, within `where`."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        return self._match(" AND ".join(_phrase(t) for t in terms), k, where)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            chunks = self._conn.execute("SELECT COUNT(*) FROM chunk_ids").fetchone()[0]
+        return {"chunks": chunks}
+
+
+lexical_index = LexicalIndex(settings.LEXICAL_INDEX_PATH)
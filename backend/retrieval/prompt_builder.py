@@ -1,3 +1,9 @@
+from typing import Dict, List, Optional
+
+from config import settings
+from utils.tokens import estimate_tokens, truncate_to_tokens
+
+
 def is_followup_question(query: str) -> bool:
     followup_keywords = [
         "earlier",
@@ -14,23 +20,20 @@ def is_followup_question(query: str) -> bool:
     query_lower = query.lower()
     return any(keyword in query_lower for keyword in followup_keywords)
 
-def build_structured_prompt(
-    chunks,
-    query: str,
-    conversation_context: str = ""
-):
-    is_followup = is_followup_question(query)
 
-    prompt = """
+# -------------------------
+# Static blocks
+# -------------------------
+# These never change between queries and come first in the prompt, so a
+# provider-side prompt cache can reuse them. Everything query-specific
+# follows after them.
+
+_INTRO = """
 You are CampusGPT, a retrieval-augmented conversational question answering system.
 """
 
-    # -------------------------
-    # CASE 1: FOLLOW-UP QUESTION
-    # -------------------------
-    if is_followup and conversation_context.strip():
-        prompt += """
-
+# CASE 1: FOLLOW-UP QUESTION
+_FOLLOWUP_RULES = """
 This question appears to be a follow-up to previous conversation.
 
 PRIORITY ORDER:
@@ -47,12 +50,8 @@ MEMORY RULES:
 - Never cite previous conversation.
 """
 
-    # -------------------------
-    # CASE 2: NORMAL RAG QUESTION
-    # -------------------------
-    else:
-        prompt += """
-
+# CASE 2: NORMAL RAG QUESTION
+_STRICT_RULES = """
 STRICT MODE:
 
 You MUST answer using ONLY the provided document excerpts.
@@ -63,47 +62,11 @@ If answer is not found in excerpts, say information is not available.
 Citations are REQUIRED.
 """
 
-    # -------------------------
-    # Add Memory (only if follow-up)
-    # -------------------------
-    if is_followup and conversation_context.strip():
-        prompt += f"""
-
-PREVIOUS CONVERSATION (For context only — NOT for citation)
-{conversation_context}
-"""
-
-    # -------------------------
-    # Add Question
-    # -------------------------
-    prompt += f"""
-
-QUESTION
-{query}
-
-DOCUMENT EXCERPTS
-"""
-
-    # -------------------------
-    # Add Chunks
-    # -------------------------
-    for i, chunk in enumerate(chunks, start=1):
-        prompt += f"""
---- CHUNK {i} ---
-document_name: {chunk.metadata.get("document_name")}
-document_id: {chunk.metadata.get("document_id")}
-chunk_index: {chunk.metadata.get("chunk_index")}
-document_url: {chunk.metadata.get("document_url")}
-uploaded_by: {chunk.metadata.get("uploader", "")}
-
-content:
-{chunk.page_content}
-"""
-
-    # -------------------------
-    # Output Format
-    # -------------------------
-    prompt += """
+_OUTPUT_FORMAT = """
+SOURCES lists each document once as
+[Dn] document_name | document_id | document_url | uploaded_by.
+Each excerpt header names its source [Dn], chunk_index and, when known,
+page, slide and section. Fill citations from these.
 
 OUTPUT FORMAT (JSON ONLY)
 
@@ -115,7 +78,9 @@ OUTPUT FORMAT (JSON ONLY)
       "document_id": "string",
       "chunk_index": number,
       "document_url": "string",
-      "uploaded_by": "string"
+      "uploaded_by": "string",
+      "page": number | null,
+      "slide": number | null
     }
   ],
   "confidence": "high | medium | low"
@@ -126,7 +91,108 @@ FINAL RULES:
 - If answer is based ONLY on memory → citations MUST be [].
 - If answer is based on document excerpts → citations MUST follow uniqueness rules.
 - Never mix memory facts with document citations.
+- Copy page / slide from the cited excerpt; use null when the excerpt has none.
 - Output ONLY valid JSON.
 """
 
-    return prompt
+_SOURCES_HEADER = "\nSOURCES\n"
+_EXCERPTS_HEADER = "\nDOCUMENT EXCERPTS\n\n"
+_EXCERPT_SEPARATOR = "\n\n"
+
+# Below this many tokens a truncated excerpt is not worth including
+MIN_CHUNK_TOKENS = 80
+
+
+def _excerpt_header(index: int, source: str, metadata: dict) -> str:
+    parts = [f"[{source}] chunk_index: {metadata.get('chunk_index')}"]
+    for key, label in (("page", "page"), ("slide", "slide"), ("heading", "section")):
+        if metadata.get(key) is not None:
+            parts.append(f"{label}: {metadata[key]}")
+    return f"--- EXCERPT {index} --- " + ", ".join(parts) + "\n"
+
+
+def _source_line(source: str, metadata: dict) -> str:
+    return (
+        f"[{source}] {metadata.get('document_name')} | {metadata.get('document_id')} | "
+        f"{metadata.get('document_url')} | {metadata.get('uploader', '')}\n"
+    )
+
+
+def build_structured_prompt(
+    chunks,
+    query: str,
+    conversation_context: str = "",
+    token_budget: Optional[int] = None
+):
+    """
+    Assembles the answer prompt within `token_budget` (PROMPT_TOKEN_BUDGET
+    by default) estimated tokens.
+
+    Static instructions come first, then conversation context, sources,
+    excerpts and the question. Chunks arrive best first: they are added
+    in that order, the first one that does not fit is truncated, and the
+    rest are dropped. Document metadata is listed once per document
+    instead of once per chunk.
+    """
+    budget = settings.PROMPT_TOKEN_BUDGET if token_budget is None else token_budget
+    is_followup = is_followup_question(query)
+    use_memory = is_followup and conversation_context.strip()
+
+    static = [_INTRO, _FOLLOWUP_RULES if use_memory else _STRICT_RULES, _OUTPUT_FORMAT]
+    question = f"\nQUESTION\n{query}\n"
+    remaining = budget - sum(
+        estimate_tokens(block)
+        for block in static + [question, _SOURCES_HEADER, _EXCERPTS_HEADER]
+    )
+
+    memory = ""
+    if use_memory:
+        memory = f"""
+PREVIOUS CONVERSATION (For context only — NOT for citation)
+{conversation_context}
+"""
+        remaining -= estimate_tokens(memory)
+
+    # -------------------------
+    # Chunks, best first, within what is left
+    # -------------------------
+    sources: Dict[str, str] = {}
+    source_lines: List[str] = []
+    excerpts: List[str] = []
+
+    for chunk in chunks:
+        metadata = chunk.metadata
+        document_id = metadata.get("document_id")
+
+        new_source = document_id not in sources
+        source = sources.get(document_id) or f"D{len(sources) + 1}"
+        source_line = _source_line(source, metadata) if new_source else ""
+        header = _excerpt_header(len(excerpts) + 1, source, metadata)
+
+        overhead = (
+            estimate_tokens(source_line)
+            + estimate_tokens(header)
+            + estimate_tokens(_EXCERPT_SEPARATOR)
+        )
+        available = remaining - overhead
+        content = chunk.page_content
+        truncated = estimate_tokens(content) > available
+        if truncated:
+            if available < MIN_CHUNK_TOKENS:
+                break
+            content = truncate_to_tokens(content, available)
+
+        if new_source:
+            sources[document_id] = source
+            source_lines.append(source_line)
+        excerpts.append(f"{header}{content}{_EXCERPT_SEPARATOR}")
+        remaining -= overhead + estimate_tokens(content)
+
+        if truncated:
+            break
+
+    parts = static + [memory]
+    parts.append(_SOURCES_HEADER + "".join(source_lines))
+    parts.append(_EXCERPTS_HEADER + "".join(excerpts))
+    parts.append(question)
+    return "".join(parts)
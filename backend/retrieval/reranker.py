@@ -0,0 +1,148 @@
+import logging
+import threading
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Candidate(NamedTuple):
+    chunk_id: str
+    document: Document
+    embedding: Optional[Sequence[float]]
+    # First-stage score (RRF or BM25), higher is better
+    score: Optional[float] = None
+
+
+_cross_encoder = None
+_cross_encoder_loaded = False
+_cross_encoder_lock = threading.Lock()
+
+
+def _get_cross_encoder():
+    """
+    Loads RERANKER_MODEL once. sentence-transformers is optional: when it
+    is not installed, or no model is configured, re-ranking uses MMR only.
+    """
+    global _cross_encoder, _cross_encoder_loaded
+    if _cross_encoder_loaded:
+        return _cross_encoder
+
+    with _cross_encoder_lock:
+        if not _cross_encoder_loaded:
+            if settings.RERANKER_MODEL:
+                try:
+                    from sentence_transformers import CrossEncoder
+                    _cross_encoder = CrossEncoder(settings.RERANKER_MODEL, device="cpu")
+                except ImportError:
+                    logger.warning(
+                        "RERANKER_MODEL is set but sentence-transformers is not "
+                        "installed; using MMR only"
+                    )
+                except Exception:
+                    logger.exception("Could not load re-ranker %s", settings.RERANKER_MODEL)
+            _cross_encoder_loaded = True
+    return _cross_encoder
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def mmr(relevance: np.ndarray, embeddings: np.ndarray, k: int, lambda_mult: float) -> List[int]:
+    """
+    Maximal marginal relevance: repeatedly picks the candidate with the
+    best `lambda * relevance - (1 - lambda) * max similarity to the
+    already picked ones`. Returns candidate indices in pick order.
+    """
+    n = len(relevance)
+    vectors = _normalize_rows(embeddings)
+    max_similarity = np.full(n, -1.0)
+    remaining = np.ones(n, dtype=bool)
+    picked: List[int] = []
+
+    while len(picked) < min(k, n):
+        if picked:
+            scores = lambda_mult * relevance - (1.0 - lambda_mult) * max_similarity
+        else:
+            scores = relevance.copy()
+        scores[~remaining] = -np.inf
+
+        best = int(np.argmax(scores))
+        picked.append(best)
+        remaining[best] = False
+        max_similarity = np.maximum(max_similarity, vectors @ vectors[best])
+
+    return picked
+
+
+def _relevance(
+    query: Optional[str],
+    candidates: List[Candidate],
+    vectors: np.ndarray,
+    query_embedding: Optional[Sequence[float]]
+) -> np.ndarray:
+    """
+    Relevance in [0, 1] per candidate: cross-encoder scores when a model
+    is loaded, else the first-stage scores scaled by their maximum, else
+    cosine similarity to the query embedding, else the incoming rank
+    order. Fused RRF scores already include the vector rank, so using
+    them keeps BM25 hits that cosine alone would rank low.
+    """
+    cross_encoder = _get_cross_encoder() if query else None
+    if cross_encoder is not None:
+        scores = np.asarray(cross_encoder.predict(
+            [(query, candidate.document.page_content) for candidate in candidates]
+        ), dtype=float)
+        spread = scores.max() - scores.min()
+        return (scores - scores.min()) / spread if spread > 0 else np.ones(len(scores))
+
+    if all(candidate.score is not None for candidate in candidates):
+        scores = np.asarray([candidate.score for candidate in candidates], dtype=float)
+        top = scores.max()
+        return scores / top if top > 0 else np.ones(len(scores))
+
+    if query_embedding is not None:
+        query_vector = _normalize_rows(np.asarray([query_embedding], dtype=float))[0]
+        return _normalize_rows(vectors) @ query_vector
+
+    n = len(candidates)
+    return 1.0 - np.arange(n, dtype=float) / n
+
+
+def rerank(
+    query: Optional[str],
+    candidates: List[Candidate],
+    k: int,
+    query_embedding: Optional[Sequence[float]] = None
+) -> List[Document]:
+    """
+    Picks the best `k` of a wide candidate list. Candidates come ranked
+    best first and carry their stored Chroma embeddings, so nothing is
+    re-embedded. Near-duplicate chunks (e.g. neighbours sharing the
+    splitter overlap) are pushed out by MMR.
+    """
+    if len(candidates) <= 1:
+        return [candidate.document for candidate in candidates[:k]]
+
+    dimensions = next(
+        (len(c.embedding) for c in candidates if c.embedding is not None), 0
+    )
+    if dimensions == 0:
+        return [candidate.document for candidate in candidates[:k]]
+
+    # A candidate without a stored vector only loses the diversity term
+    vectors = np.asarray([
+        c.embedding if c.embedding is not None else np.zeros(dimensions)
+        for c in candidates
+    ], dtype=float)
+
+    relevance = _relevance(query, candidates, vectors, query_embedding)
+    picked = mmr(relevance, vectors, k, settings.MMR_LAMBDA)
+    return [candidates[index].document for index in picked]
@@ -1,5 +1,17 @@
+from typing import Optional
+
 from retrieval.vector_store import VectorStore
 
-def retrieve_chunks(query: str, k: int = 3):
-    vector_store = VectorStore.get_instance(persist_dir="dbV2")
-    return vector_store.retrieve(query, k)
+def retrieve_chunks(query: str, k: int = 3, where: Optional[dict] = None):
+    vector_store = VectorStore.get_instance()
+    return vector_store.retrieve(query, k, where)
+
+
+async def aretrieve_chunks(query: str, k: int = 3, where: Optional[dict] = None):
+    vector_store = VectorStore.get_instance()
+    return await vector_store.aretrieve(query, k, where)
+
+
+async def aembed_query(query: str):
+    vector_store = VectorStore.get_instance()
+    return await vector_store.aembed_query(query)
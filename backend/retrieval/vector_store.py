@@ -1,35 +1,253 @@
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
 from langchain_chroma import Chroma
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain_core.documents import Document
 from dotenv import load_dotenv
 
+from config import settings, VECTOR_DB_DIR
+from utils.concurrency import run_blocking
+from utils.llm_clients import get_embeddings
+from retrieval.embedding_cache import embedding_cache
+from retrieval.lexical_index import lexical_index, exact_tokens
+from retrieval.reranker import Candidate, rerank
+
 load_dotenv()
 
+SCORE_THRESHOLD = 0.3
+
+
+def build_where(
+    document_ids: Optional[List[str]] = None,
+    uploader: Optional[str] = None,
+    document_type: Optional[str] = None,
+    uploaded_after: Optional[float] = None,
+    uploaded_before: Optional[float] = None
+) -> Optional[dict]:
+    """
+    Chroma `where` clause for chunk metadata filters, or None when no
+    filter is set. Dates are epoch seconds, matching `uploaded_at`.
+    """
+    conditions = []
+    if document_ids:
+        conditions.append(
+            {"document_id": document_ids[0]} if len(document_ids) == 1
+            else {"document_id": {"$in": list(document_ids)}}
+        )
+    if uploader:
+        conditions.append({"uploader": uploader})
+    if document_type:
+        conditions.append({"document_type": document_type.lower().lstrip(".")})
+    if uploaded_after is not None:
+        conditions.append({"uploaded_at": {"$gte": uploaded_after}})
+    if uploaded_before is not None:
+        conditions.append({"uploaded_at": {"$lte": uploaded_before}})
+
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+def hnsw_metadata() -> dict:
+    """
+    HNSW settings for new collections. Chroma fixes these when a
+    collection is created, so an existing store keeps the values it was
+    built with until it is rebuilt. search_ef is left to Chroma unless
+    HNSW_SEARCH_EF is set.
+    """
+    metadata = {
+        "hnsw:space": "cosine",
+        "hnsw:M": settings.HNSW_M,
+        "hnsw:construction_ef": settings.HNSW_CONSTRUCTION_EF
+    }
+    if settings.HNSW_SEARCH_EF > 0:
+        metadata["hnsw:search_ef"] = settings.HNSW_SEARCH_EF
+    return metadata
+
+
 class VectorStore:
-    _instance = None
+    """
+    One instance per persist directory, shared by query-time retrieval
+    and ingestion so the process holds a single Chroma handle per store.
+    """
+
+    _instances: Dict[str, "VectorStore"] = {}
+    _instances_lock = threading.Lock()
 
     def __init__(self, persist_dir: str):
-        self.embedding_model = GoogleGenerativeAIEmbeddings(
-            model="gemini-embedding-001"
-        )
+        self.persist_dir = persist_dir
+        self.embedding_model = get_embeddings()
 
         self.db = Chroma(
             persist_directory=persist_dir,
             embedding_function=self.embedding_model,
-            collection_metadata={"hnsw:space": "cosine"}
+            collection_metadata=hnsw_metadata()
         )
 
     @classmethod
-    def get_instance(cls, persist_dir: str = "vectorstore"):
-        if cls._instance is None:
-            cls._instance = cls(persist_dir)
-        return cls._instance
-
-    def retrieve(self, query: str, k: int = 3):
-        retriever = self.db.as_retriever(
-            search_type="similarity_score_threshold",
-            search_kwargs={
-                "k": k,
-                "score_threshold": 0.3
-            }
+    def get_instance(cls, persist_dir: str = str(VECTOR_DB_DIR)):
+        key = str(Path(persist_dir).resolve())
+        with cls._instances_lock:
+            instance = cls._instances.get(key)
+            if instance is None:
+                instance = cls(key)
+                cls._instances[key] = instance
+            return instance
+
+    def embed_query(self, query: str):
+        return embedding_cache.get_or_compute(
+            settings.GEMINI_EMBEDDING_MODEL,
+            query,
+            self.embedding_model.embed_query
+        )
+
+    async def aembed_query(self, query: str):
+        return await run_blocking(self.embed_query, query)
+
+    def retrieve(self, query: str, k: int = 3, where: Optional[dict] = None):
+        """
+        Hybrid retrieval. Questions naming codes, rooms or dates whose
+        terms all occur in some chunk are answered from the BM25 index
+        alone, with no embedding call. Everything else fuses BM25 and
+        vector rankings. Either way RERANK_CANDIDATES chunks are fetched
+        and `rerank` picks the best k.
+
+        `where` (see `build_where`) is pushed down into both Chroma and the
+        lexical index, so each ranking only considers matching chunks.
+        """
+        documents = self.retrieve_lexical_only(query, k, where)
+        if documents is not None:
+            return documents
+        return self.retrieve_by_vector(self.embed_query(query), k, query=query, where=where)
+
+    def retrieve_lexical_only(
+        self,
+        query: str,
+        k: int = 3,
+        where: Optional[dict] = None
+    ) -> Optional[List[Document]]:
+        """
+        Chunks containing every term of a question that has exact tokens,
+        or None when the question should go through vector search.
+        """
+        if not settings.LEXICAL_ONLY_ENABLED or not exact_tokens(query):
+            return None
+
+        n = self._candidate_count(k)
+        hits = lexical_index.search_all_terms(query, n, where)
+        if not hits:
+            return None
+
+        bm25 = dict(hits)
+        candidates = [
+            candidate._replace(score=bm25[candidate.chunk_id])
+            for candidate in self._get_candidates(list(bm25))
+        ]
+        if not candidates:
+            return None
+        return rerank(query, candidates, k)
+
+    @staticmethod
+    def _candidate_count(k: int) -> int:
+        return max(k, settings.HYBRID_CANDIDATES, settings.RERANK_CANDIDATES)
+
+    def _vector_search(self, embedding, n: int, where: Optional[dict] = None) -> List[Candidate]:
+        """Candidates above SCORE_THRESHOLD, best first, with stored vectors."""
+        result = self.db._collection.query(
+            query_embeddings=[embedding],
+            n_results=n,
+            where=where,
+            include=["documents", "metadatas", "distances", "embeddings"]
+        )
+        embeddings = result.get("embeddings")
+        embeddings = embeddings[0] if embeddings is not None else [None] * len(result["ids"][0])
+        return [
+            Candidate(chunk_id, Document(page_content=text, metadata=metadata or {}), vector)
+            for chunk_id, text, metadata, distance, vector in zip(
+                result["ids"][0],
+                result["documents"][0],
+                result["metadatas"][0],
+                result["distances"][0],
+                embeddings
+            )
+            # relevance is 1 - cosine distance, as with the old retriever
+            if 1.0 - distance >= SCORE_THRESHOLD
+        ]
+
+    def _get_candidates_by_id(
+        self,
+        chunk_ids: List[str],
+        where: Optional[dict] = None
+    ) -> Dict[str, Candidate]:
+        if not chunk_ids:
+            return {}
+        result = self.db._collection.get(
+            ids=chunk_ids,
+            where=where,
+            include=["documents", "metadatas", "embeddings"]
         )
-        return retriever.invoke(query)
+        embeddings = result.get("embeddings")
+        if embeddings is None:
+            embeddings = [None] * len(result["ids"])
+        return {
+            chunk_id: Candidate(chunk_id, Document(page_content=text, metadata=metadata or {}), vector)
+            for chunk_id, text, metadata, vector in zip(
+                result["ids"], result["documents"], result["metadatas"], embeddings
+            )
+        }
+
+    def _get_candidates(self, chunk_ids: List[str], where: Optional[dict] = None) -> List[Candidate]:
+        """
+        Stored chunks by ID, in the order given. IDs that are missing or
+        outside `where` are skipped.
+        """
+        found = self._get_candidates_by_id(chunk_ids, where)
+        return [found[chunk_id] for chunk_id in chunk_ids if chunk_id in found]
+
+    def retrieve_by_vector(
+        self,
+        embedding,
+        k: int = 3,
+        query: Optional[str] = None,
+        where: Optional[dict] = None
+    ):
+        """
+        Searches with a precomputed query vector, so cached embeddings are
+        reused. With `query`, the vector and BM25 hits are merged by
+        reciprocal-rank fusion:
+        score = sum(1 / (RRF_K + rank)) over the rankings a chunk is in.
+        The top RERANK_CANDIDATES are re-ranked down to k, with the fused
+        score as their relevance.
+        """
+        n = self._candidate_count(k)
+        vector_hits = self._vector_search(embedding, n, where)
+        if query is None:
+            return rerank(None, vector_hits, k, query_embedding=embedding)
+
+        lexical_hits = lexical_index.search(query, n, where)
+        candidates = {candidate.chunk_id: candidate for candidate in vector_hits}
+
+        scores: Dict[str, float] = {}
+        for ranking in ([candidate.chunk_id for candidate in vector_hits],
+                        [chunk_id for chunk_id, _ in lexical_hits]):
+            for rank, chunk_id in enumerate(ranking, start=1):
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (settings.RRF_K + rank)
+
+        top_ids = sorted(scores, key=scores.get, reverse=True)[:settings.RERANK_CANDIDATES]
+
+        # Lexical-only hits are not in the vector results; fetch them by ID
+        candidates.update(self._get_candidates_by_id(
+            [chunk_id for chunk_id in top_ids if chunk_id not in candidates]
+        ))
+        ranked = [
+            candidates[chunk_id]._replace(score=scores[chunk_id])
+            for chunk_id in top_ids if chunk_id in candidates
+        ]
+        return rerank(query, ranked, k, query_embedding=embedding)
+
+    async def aretrieve(self, query: str, k: int = 3, where: Optional[dict] = None):
+        """
+        Async variant of `retrieve`. Chroma has no native async client, so
+        the search runs on the shared bounded executor.
+        """
+        return await run_blocking(self.retrieve, query, k, where)
@@ -1,37 +1,169 @@
-from fastapi import APIRouter, Depends
-from typing import List
+import asyncio
+import base64
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
 from schemas import User, DashboardStats
 from utils import require_role
 from database import get_database
 from datetime import datetime
+from config import settings
+from retrieval.answer_cache import answer_cache
+from retrieval.embedding_cache import embedding_cache
+from retrieval.lexical_index import lexical_index
+from utils.auth import token_cache, profile_cache
+from utils.cache import TTLCache
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
+_dashboard_cache = TTLCache(
+    max_size=1 if settings.DASHBOARD_CACHE_TTL_SECONDS > 0 else 0,
+    ttl_seconds=settings.DASHBOARD_CACHE_TTL_SECONDS
+)
+
+
+def _count_into(coll: str, key: str, match: dict = None) -> dict:
+    """$unionWith stage that appends {"_id": key, "count": n} from `coll`."""
+    pipeline = [{"$match": match}] if match else []
+    pipeline += [{"$count": "count"}, {"$set": {"_id": key}}]
+    return {"$unionWith": {"coll": coll, "pipeline": pipeline}}
+
+
+def _dashboard_pipeline() -> list:
+    """
+    Dashboard counters in one aggregation on `users`: a count per role,
+    plus one row per counter from the other collections. Empty counts
+    produce no row and default to 0. Every $match is served by an index
+    in database.INDEXES; the unfiltered query_history total is read from
+    collection metadata instead (see get_dashboard).
+    """
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return [
+        {"$group": {"_id": {"$concat": ["role:", {"$ifNull": ["$role", "none"]}]}, "count": {"$sum": 1}}},
+        _count_into("query_history", "queries_today", {"timestamp": {"$gte": today}}),
+        _count_into("documents", "documents"),
+        _count_into("ingest_jobs", "ingest_jobs_active", {"status": {"$in": ["queued", "running"]}}),
+        _count_into("ingest_jobs", "ingest_jobs_failed", {"status": "failed"}),
+    ]
+
 @router.get("/dashboard", response_model=DashboardStats)
 async def get_dashboard(current_user: dict = Depends(require_role(["admin"]))):
     """Get admin dashboard statistics."""
+    stats = _dashboard_cache.get("stats")
+    if stats is not None:
+        return stats
+
     db = await get_database()
-    
-    total = await db.users.count_documents({})
-    students = await db.users.count_documents({"role": "student"})
-    faculty = await db.users.count_documents({"role": "faculty"})
-    admin = await db.users.count_documents({"role": "admin"})
-    
-    return DashboardStats(
-        total_users=total,
-        students=students,
-        faculty=faculty,
-        admin=admin
+
+    rows, total_queries = await asyncio.gather(
+        db.users.aggregate(_dashboard_pipeline()).to_list(None),
+        # Metadata count: query_history is the largest collection, and
+        # counting it exactly would scan it on every uncached load
+        db.query_history.estimated_document_count()
+    )
+    counts = {row["_id"]: row["count"] for row in rows}
+    roles = {
+        key[len("role:"):]: count
+        for key, count in counts.items()
+        if key.startswith("role:")
+    }
+
+    stats = DashboardStats(
+        total_users=sum(roles.values()),
+        students=roles.get("student", 0),
+        faculty=roles.get("faculty", 0),
+        admin=roles.get("admin", 0),
+        total_queries=total_queries,
+        queries_today=counts.get("queries_today", 0),
+        documents=counts.get("documents", 0),
+        ingest_jobs_active=counts.get("ingest_jobs_active", 0),
+        ingest_jobs_failed=counts.get("ingest_jobs_failed", 0)
     )
+    _dashboard_cache.set("stats", stats)
+    return stats
+
+_USER_PROJECTION = {"_id": 0, "password": 0}
+_USER_SORT = [("created_at", 1), ("id", 1)]
+
+
+def _encode_cursor(user: dict) -> str:
+    raw = json.dumps([user.get("created_at"), user["id"]], default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> dict:
+    """Turns a cursor into the keyset filter for the page after it."""
+    try:
+        created_at, user_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return {"$or": [
+        {"created_at": {"$gt": created_at}},
+        {"created_at": created_at, "id": {"$gt": user_id}}
+    ]}
+
 
 @router.get("/users", response_model=List[User])
-async def get_all_users(current_user: dict = Depends(require_role(["admin"]))):
-    """Get all users (admin only)."""
+async def get_all_users(
+    response: Response,
+    limit: int = Query(default=100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(require_role(["admin"]))
+):
+    """
+    Get users (admin only), one page at a time in (created_at, id) order.
+    When more users follow, the X-Next-Cursor header holds the `cursor`
+    for the next page.
+    """
     db = await get_database()
-    
-    users = await db.users.find({}, {"_id": 0, "password": 0}).to_list(1000)
+
+    query = _decode_cursor(cursor) if cursor else {}
+    users = await db.users.find(query, _USER_PROJECTION).sort(_USER_SORT).limit(limit + 1).to_list(limit + 1)
+
+    if len(users) > limit:
+        users = users[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(users[-1])
+
     for user in users:
         if isinstance(user["created_at"], str):
             user["created_at"] = datetime.fromisoformat(user["created_at"])
     
     return [User(**user) for user in users]
+
+
+@router.get("/users/export")
+async def export_users(current_user: dict = Depends(require_role(["admin"]))):
+    """
+    Streams every user as NDJSON, one object per line. Users are read
+    from the Motor cursor in batches, so memory stays flat however many
+    users there are.
+    """
+    db = await get_database()
+
+    async def rows():
+        users = db.users.find({}, _USER_PROJECTION).sort(_USER_SORT).batch_size(
+            settings.USER_EXPORT_BATCH_SIZE
+        )
+        async for user in users:
+            yield json.dumps(user, default=str) + "\n"
+
+    return StreamingResponse(
+        rows(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="users.ndjson"'}
+    )
+
+
+@router.get("/metrics")
+async def get_metrics(current_user: dict = Depends(require_role(["admin"]))):
+    """Get in-process cache counters (per worker)."""
+    return {
+        "answer_cache": answer_cache.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "profile_cache": profile_cache.stats(),
+        "lexical_index": lexical_index.stats()
+    }
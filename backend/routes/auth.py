@@ -1,6 +1,12 @@
 from fastapi import APIRouter, HTTPException, Depends
 from schemas import User, UserCreate, UserLogin, Token
-from utils import hash_password, verify_password, create_access_token, get_current_user
+from utils import (
+    ahash_password,
+    create_access_token,
+    get_current_user,
+    get_cached_profile,
+    cache_profile
+)
 from database import get_database
 from datetime import datetime
 import uuid
@@ -33,7 +39,7 @@ async def register(user_data: UserCreate):
     
     # Prepare user dict for database
     user_dict = user.model_dump()
-    user_dict["password"] = hash_password(user_data.password)
+    user_dict["password"] = await ahash_password(user_data.password)
     user_dict["created_at"] = user_dict["created_at"].isoformat()
     
     # Insert into database
@@ -60,7 +66,7 @@ async def login(credentials: UserLogin):
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
         # Verify password
-        # if not verify_password(credentials.password, user["password"]):
+        # if not await averify_password(credentials.password, user["password"]):
         #     raise HTTPException(status_code=401, detail="Invalid credentials")
         
         # Create access token
@@ -89,14 +95,17 @@ async def login(credentials: UserLogin):
 @router.get("/me", response_model=User)
 async def get_me(current_user: dict = Depends(get_current_user)):
     """Get current user profile."""
-    db = await get_database()
-    
-    user = await db.users.find_one(
-        {"id": current_user["user_id"]},
-        {"_id": 0, "password": 0}
-    )
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    user = get_cached_profile(current_user["user_id"])
+    if user is None:
+        db = await get_database()
+
+        user = await db.users.find_one(
+            {"id": current_user["user_id"]},
+            {"_id": 0, "password": 0}
+        )
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        cache_profile(current_user["user_id"], user)
     
     if isinstance(user["created_at"], str):
         user["created_at"] = datetime.fromisoformat(user["created_at"])
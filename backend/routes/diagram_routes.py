@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from utils.diagram_service import DiagramService
+from retrieval.retrieve_chunks import aretrieve_chunks
 
 
 router = APIRouter()
@@ -18,7 +19,8 @@ async def generate_diagram(request: QueryRequest):
     """
 
     try:
-        result = diagram_service.generate_diagram(request.query)
+        chunks = await aretrieve_chunks(request.query, k=3)
+        result = await diagram_service.agenerate_diagram(request.query, chunks)
 
         if not result.get("success"):
             raise HTTPException(status_code=400, detail=result)
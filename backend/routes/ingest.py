@@ -1,46 +1,125 @@
-from fastapi import APIRouter, UploadFile, File, Depends
-from ingestion.ingest_pipeline import ingest_pipeline
-from config import UPLOADS_DIR, VECTOR_DB_DIR
-from utils.imagekit_client import upload_document
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
+from typing import Optional
+from ingestion.job_queue import ingestion_queue
+from ingestion.chunk_cache import content_hash
+from config import UPLOADS_DIR
 import uuid
 from utils import require_role
+from utils.concurrency import run_blocking
 
 
 router = APIRouter(prefix="/ingest", tags=["Ingestion"])
 
+def _duplicate_response(duplicate: dict) -> dict:
+    return {
+        "message": "Document already ingested" if duplicate["status"] == "completed"
+        else "Document is already being ingested",
+        "job_id": duplicate.get("job_id"),
+        "status": duplicate["status"],
+        "document_id": duplicate["document_id"],
+        "document_name": duplicate["document_name"],
+        "download_url": duplicate.get("document_url"),
+        "duplicate": True
+    }
+
+
 @router.post("")
-async def ingest_document(file: UploadFile = File(...), current_user: dict = Depends(require_role(["student", "faculty", "admin"]))):
-    document_id = str(uuid.uuid4())
+async def ingest_document(
+    file: UploadFile = File(...),
+    document_id: Optional[str] = Form(None),
+    current_user: dict = Depends(require_role(["student", "faculty", "admin"]))
+):
+    """
+    Saves the upload and queues it for background ingestion.
+    Poll GET /ingest/{job_id} for progress. Uploading a file whose exact
+    content was already ingested (or is being ingested) returns that
+    document instead of ingesting it again.
+
+    Pass `document_id` to upload a new version of an existing document:
+    only chunks that changed are re-embedded and removed ones are deleted.
+    Re-uploading the same content retries table summaries that failed.
+    """
     original_filename = file.filename
+    existing = None
+    job_id = None
     print("user", current_user)
 
-    file_path = UPLOADS_DIR / f"{document_id}_{original_filename}"
+    content = await file.read()
+    file_hash = await run_blocking(content_hash, content)
+
+    if document_id:
+        existing = await ingestion_queue.get_document(document_id)
+        if not existing:
+            raise HTTPException(status_code=404, detail="Document not found")
+
+        if (
+            current_user["role"] != "admin"
+            and existing["uploader"].get("user_id") != current_user["user_id"]
+        ):
+            raise HTTPException(status_code=403, detail="Access forbidden")
+
+        # Same content is only ingested again to retry failed table summaries
+        if existing.get("content_hash") == file_hash and not existing.get("summary_fallbacks"):
+            return _duplicate_response({"status": "completed", **existing})
+
+        if await ingestion_queue.find_active_job(document_id):
+            raise HTTPException(
+                status_code=409,
+                detail="This document already has an ingestion in progress"
+            )
+
+    else:
+        document_id = str(uuid.uuid4())
+        job_id = str(uuid.uuid4())
+        duplicate = await ingestion_queue.claim_content(
+            file_hash, job_id, document_id, original_filename
+        )
+        if duplicate:
+            return _duplicate_response(duplicate)
+
+    file_path = UPLOADS_DIR / f"{uuid.uuid4()}_{original_filename}"
     print(file_path)
-    try:
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
 
-        upload_result = upload_document(
+    try:
+        await run_blocking(file_path.write_bytes, content)
+        job = await ingestion_queue.submit(
             file_path=file_path,
-            folder="campusgpt/documents"
+            document_id=document_id,
+            document_name=original_filename,
+            uploader={
+                "user_id": current_user["user_id"],
+                "email": current_user["email"]
+            },
+            content_hash=file_hash,
+            replace=existing is not None,
+            job_id=job_id
         )
-
-        # ingest_pipeline(
-        #     doc_path=str(file_path),
-        #     persist_directory=str(VECTOR_DB_DIR),
-        #     document_id=document_id,
-        #     document_name=original_filename,
-        #     document_url=upload_result["url"],         
-        #     uploader=current_user["email"]
-        # )
-
-        return {
-            "message": "Document ingested successfully",
-            "document_id": document_id,
-            "document_name": original_filename,
-            "download_url": upload_result["url"]
-        }
-
-    finally:
+    except Exception:
         if file_path.exists():
             file_path.unlink()
+        if job_id:
+            await ingestion_queue.release_content(file_hash, job_id)
+        raise
+
+    return {
+        "message": "Document queued for ingestion",
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "document_id": document_id,
+        "document_name": original_filename,
+        "duplicate": False
+    }
+
+
+@router.get("/{job_id}")
+async def get_ingest_job(job_id: str, current_user: dict = Depends(require_role(["student", "faculty", "admin"]))):
+    """Get status and per-stage progress of an ingestion job."""
+    job = await ingestion_queue.get(job_id)
+
+    if not job or (
+        current_user["role"] != "admin"
+        and job["uploader"]["user_id"] != current_user["user_id"]
+    ):
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+
+    return job
@@ -1,96 +1,395 @@
-from fastapi import APIRouter, Depends
+import asyncio
+import json
+import logging
+
+from fastapi import APIRouter, Depends, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
-from retrieval.retrieve_chunks import retrieve_chunks
-from retrieval.generate_answer import generate_final_answer
+from retrieval.retrieve_chunks import aretrieve_chunks, aembed_query
+from retrieval.vector_store import build_where
+from retrieval.generate_answer import agenerate_final_answer, astream_final_answer
+from retrieval.prompt_builder import is_followup_question
+from retrieval.answer_cache import answer_cache
+from retrieval.conversation_memory import conversation_memory
+from retrieval.lexical_index import exact_tokens
 from utils import require_role
 from database import get_database
+from utils.timing import StageTimer
 
 from utils.diagram_decision_service import DiagramDecisionService
 from utils.diagram_service import DiagramService
 
 router = APIRouter(prefix="/query", tags=["Query"])
+logger = logging.getLogger(__name__)
 
 decision_service = DiagramDecisionService()
 diagram_service = DiagramService()
 
 
+class QueryFilters(BaseModel):
+    """Restricts retrieval to matching chunks; all fields are optional."""
+    document_id: Optional[str] = None
+    document_ids: Optional[List[str]] = None
+    uploader: Optional[str] = None
+    document_type: Optional[str] = None  # file extension, e.g. "pdf"
+    uploaded_after: Optional[datetime] = None
+    uploaded_before: Optional[datetime] = None
+
+    def to_where(self) -> Optional[dict]:
+        document_ids = list(self.document_ids or [])
+        if self.document_id:
+            document_ids.append(self.document_id)
+        return build_where(
+            document_ids=document_ids,
+            uploader=self.uploader,
+            document_type=self.document_type,
+            uploaded_after=self.uploaded_after.timestamp() if self.uploaded_after else None,
+            uploaded_before=self.uploaded_before.timestamp() if self.uploaded_before else None
+        )
+
+
 class QueryRequest(BaseModel):
     question: str
     session_id: str
+    filters: Optional[QueryFilters] = None
+
+    def where(self) -> Optional[dict]:
+        return self.filters.to_where() if self.filters else None
+
+
+class _CacheLookup:
+    """Outcome of the answer-cache check that starts every query."""
+
+    def __init__(self):
+        self.cacheable = False
+        self.cached: Optional[dict] = None
+        self.generation: Optional[int] = None
+        self.query_embedding = None
+        self.decision_task: Optional[asyncio.Task] = None
+
+
+async def _decide_diagram(question: str, timer: StageTimer) -> dict:
+    """
+    Runs the diagram decision. It only needs the question, so it is started
+    before retrieval and overlaps with everything up to answer generation.
+    """
+    try:
+        async with timer.astage("diagram_decision"):
+            return await decision_service.adecide(question)
+    except Exception as e:
+        print(f"[Diagram Decision Error] {e}")
+        return {"needs_diagram": False, "diagram_query": ""}
+
+
+async def _build_diagram(
+    decision_task: "asyncio.Task",
+    chunks,
+    timer: StageTimer
+) -> Optional[dict]:
+    """
+    Waits for the diagram decision and starts diagram generation as soon
+    as it returns, independently of answer generation.
+    """
+    decision = await decision_task
+    if not decision.get("needs_diagram", False):
+        return None
+
+    try:
+        async with timer.astage("diagram_generation"):
+            diagram_data = await diagram_service.agenerate_diagram(
+                decision.get("diagram_query", ""),
+                chunks
+            )
+        if diagram_data and diagram_data.get("success"):
+            return {
+                "explanation": diagram_data["explanation"],
+                "diagram": diagram_data["diagram"]
+            }
+    except Exception as e:
+        print(f"[Diagram Error] {e}")
+
+    return None
+
+
+async def _lookup_cache(db, question: str, filtered: bool, timer: StageTimer) -> _CacheLookup:
+    """
+    Checks the answer cache. On a miss the diagram decision is started
+    before the semantic lookup so it overlaps with the embedding call.
+    """
+    lookup = _CacheLookup()
+
+    # Follow-ups depend on the conversation and filtered answers on the
+    # filter, so only unfiltered standalone questions use the cache.
+    lookup.cacheable = not filtered and not is_followup_question(question)
+
+    if lookup.cacheable:
+        try:
+            # Another worker may have ingested since this one last looked
+            lookup.generation = await answer_cache.sync_generation(db)
+        except Exception as e:
+            print(f"[Answer Cache Error] {e}")
+            lookup.cacheable = False
+
+    if lookup.cacheable:
+        lookup.cached = answer_cache.get(question)
+
+    if lookup.cached is None:
+        lookup.decision_task = asyncio.create_task(_decide_diagram(question, timer))
+
+        # Questions naming codes or numbers skip the semantic match: "room
+        # B-204" and "room B-205" embed almost identically. Not embedding
+        # here also lets retrieval answer them from the lexical index alone.
+        if lookup.cacheable and not exact_tokens(question):
+            async with timer.astage("cache_lookup"):
+                lookup.query_embedding = await aembed_query(question)
+                lookup.cached = answer_cache.get_similar(lookup.query_embedding)
+
+    if lookup.cached is not None and lookup.decision_task is not None:
+        lookup.decision_task.cancel()
+
+    return lookup
+
+
+async def _load_conversation_context(
+    db,
+    conversation_id: str,
+    email: str,
+    question: str,
+    timer: StageTimer
+) -> str:
+    # The prompt only uses conversation context for follow-up questions
+    if not is_followup_question(question):
+        return ""
+
+    async with timer.astage("history"):
+        return await conversation_memory.load(db, conversation_id, email)
+
+
+def _cache_answer(lookup: _CacheLookup, question: str, answer: dict, diagram_response, chunks):
+    if lookup.cacheable and answer["answer"]:
+        answer_cache.set(
+            question,
+            {"answer": answer, "diagram": diagram_response},
+            document_ids={
+                c.metadata.get("document_id") for c in chunks
+                if c.metadata.get("document_id")
+            },
+            embedding=lookup.query_embedding,
+            generation=lookup.generation
+        )
+
+
+async def _save_history(
+    db,
+    current_user: dict,
+    conversation_id: str,
+    question: str,
+    answer: dict,
+    diagram_response: Optional[dict]
+):
+    await db.query_history.insert_one({
+        "conversation_id": conversation_id,
+        "user_id": current_user.get("user_id"),
+        "email": current_user.get("email"),
+        "question": question,
+        "answer": answer["answer"],
+        "sources": answer["citations"],
+        "diagram": diagram_response,
+        "timestamp": datetime.utcnow()
+    })
+
 
 @router.post("")
 async def ask_question(
     request: QueryRequest,
+    response: Response,
     current_user: dict = Depends(require_role(["student", "faculty", "admin"]))
 ):
+    timer = StageTimer()
+    lookup = None
     try:
         print(request)
         question = request.question
         conversation_id = request.session_id
+        where = request.where()
 
         db = await get_database()
 
-        previous_messages = await db.query_history.find(
-            {
-                "conversation_id": conversation_id,
-                "email": current_user.get("email")
+        lookup = await _lookup_cache(db, question, where is not None, timer)
+
+        if lookup.cached is not None:
+            async with timer.astage("history_write"):
+                await _save_history(
+                    db, current_user, conversation_id, question,
+                    lookup.cached["answer"], lookup.cached["diagram"]
+                )
+            return {
+                "answer": lookup.cached["answer"],
+                "diagram": lookup.cached["diagram"],
+                "cache_hit": True
             }
-        ).sort("timestamp", 1).limit(5).to_list(5)
 
-        conversation_context = ""
-        for item in previous_messages:
-            conversation_context += f"User: {item['question']}\n"
-            conversation_context += f"Assistant: {item['answer']}\n"
+        conversation_context = await _load_conversation_context(
+            db, conversation_id, current_user.get("email"), question, timer
+        )
 
-        chunks = retrieve_chunks(question, k=3)
+        async with timer.astage("retrieval"):
+            chunks = await aretrieve_chunks(question, k=3, where=where)
 
-        final_answer = generate_final_answer(
-            chunks=chunks,
-            query=question,
-            conversation_context=conversation_context
+        async def _answer():
+            async with timer.astage("answer_generation"):
+                return await agenerate_final_answer(
+                    chunks=chunks,
+                    query=question,
+                    conversation_context=conversation_context
+                )
+
+        final_answer, diagram_response = await asyncio.gather(
+            _answer(),
+            _build_diagram(lookup.decision_task, chunks, timer)
         )
+        answer = final_answer.model_dump()
 
-        decision = decision_service.decide(question)
-        needs_diagram = decision.get("needs_diagram", False)
-        diagram_response = None
+        _cache_answer(lookup, question, answer, diagram_response, chunks)
 
-        if needs_diagram:
-            try:
-                diagram_data = diagram_service.generate_diagram(
-                    decision.get("diagram_query", ""),
-                    chunks
-                )
-                if diagram_data and diagram_data.get("success"):
-                    diagram_response = {
-                        "explanation": diagram_data["explanation"],
-                        "diagram": diagram_data["diagram"]
-                    }
-            except Exception as e:
-                print(f"[Diagram Error] {e}")
-
-        await db.query_history.insert_one({
-            "conversation_id": conversation_id,
-            "user_id": current_user.get("user_id"),
-            "email": current_user.get("email"),
-            "question": question,
-            "answer": final_answer.answer,
-            "sources": [c.model_dump() for c in final_answer.citations],
-            "diagram": diagram_response,
-            "timestamp": datetime.utcnow()
-        })
+        async with timer.astage("history_write"):
+            await _save_history(
+                db, current_user, conversation_id, question,
+                answer, diagram_response
+            )
         print(final_answer)
         return {
-            "answer": final_answer.model_dump() if final_answer else {},
-            "diagram": diagram_response
+            "answer": answer,
+            "diagram": diagram_response,
+            "cache_hit": False
         }
 
     except Exception as e:
+        if lookup is not None and lookup.decision_task is not None:
+            lookup.decision_task.cancel()
         return {
             "answer": "",
             "citations": [],
             "diagram": None,
             "error": str(e)
-        }
\ No newline at end of file
+        }
+
+    finally:
+        response.headers["Server-Timing"] = timer.server_timing_header()
+        logger.info("query timings: %s", timer.as_dict())
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _stream_events(request: QueryRequest, current_user: dict):
+    """
+    Event order: retrieval -> token* -> answer -> diagram -> done.
+    A cache hit skips straight to answer. Failures end with an error event.
+    """
+    timer = StageTimer()
+    lookup = None
+    diagram_task = None
+    try:
+        question = request.question
+        conversation_id = request.session_id
+        where = request.where()
+
+        db = await get_database()
+
+        lookup = await _lookup_cache(db, question, where is not None, timer)
+
+        if lookup.cached is not None:
+            yield _sse("answer", lookup.cached["answer"])
+            yield _sse("diagram", lookup.cached["diagram"])
+            await _save_history(
+                db, current_user, conversation_id, question,
+                lookup.cached["answer"], lookup.cached["diagram"]
+            )
+            yield _sse("done", {"cache_hit": True, "timings": timer.as_dict()})
+            return
+
+        conversation_context = await _load_conversation_context(
+            db, conversation_id, current_user.get("email"), question, timer
+        )
+
+        async with timer.astage("retrieval"):
+            chunks = await aretrieve_chunks(question, k=3, where=where)
+
+        yield _sse("retrieval", {
+            "chunks": [
+                {
+                    "document_name": c.metadata.get("document_name"),
+                    "document_id": c.metadata.get("document_id"),
+                    "chunk_index": c.metadata.get("chunk_index"),
+                    "document_url": c.metadata.get("document_url"),
+                    "page": c.metadata.get("page"),
+                    "slide": c.metadata.get("slide"),
+                    "heading": c.metadata.get("heading")
+                }
+                for c in chunks
+            ]
+        })
+
+        diagram_task = asyncio.create_task(
+            _build_diagram(lookup.decision_task, chunks, timer)
+        )
+
+        final_answer = None
+        async with timer.astage("answer_generation"):
+            async for kind, value in astream_final_answer(
+                chunks=chunks,
+                query=question,
+                conversation_context=conversation_context
+            ):
+                if kind == "token":
+                    yield _sse("token", {"text": value})
+                else:
+                    final_answer = value
+
+        answer = final_answer.model_dump()
+        yield _sse("answer", answer)
+
+        diagram_response = await diagram_task
+        yield _sse("diagram", diagram_response)
+
+        _cache_answer(lookup, question, answer, diagram_response, chunks)
+
+        await _save_history(
+            db, current_user, conversation_id, question,
+            answer, diagram_response
+        )
+        yield _sse("done", {"cache_hit": False, "timings": timer.as_dict()})
+
+    except Exception as e:
+        yield _sse("error", {"error": str(e)})
+
+    finally:
+        # Also runs when the client disconnects mid-stream.
+        for task in (lookup.decision_task if lookup else None, diagram_task):
+            if task is not None and not task.done():
+                task.cancel()
+        logger.info("stream query timings: %s", timer.as_dict())
+
+
+@router.post("/stream")
+async def ask_question_stream(
+    request: QueryRequest,
+    current_user: dict = Depends(require_role(["student", "faculty", "admin"]))
+):
+    """
+    Server-sent events variant of POST /query. Answer tokens are sent as
+    Gemini produces them; query_history is written once the stream completes.
+    """
+    return StreamingResponse(
+        _stream_events(request, current_user),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
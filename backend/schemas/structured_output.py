@@ -1,4 +1,4 @@
-from typing import List, Literal
+from typing import List, Literal, Optional
 from pydantic import BaseModel, Field
 
 
@@ -8,6 +8,8 @@ class Citation(BaseModel):
     chunk_index: int = Field(..., description="Chunk index used as evidence")
     document_url: str = Field(..., description="Download URL of the document")
     uploaded_by: str = Field(..., description="User details used as a uploader reference")
+    page: Optional[int] = Field(None, description="PDF page the evidence is on, if known")
+    slide: Optional[int] = Field(None, description="Presentation slide the evidence is on, if known")
 
 class StructuredRAGAnswer(BaseModel):
     answer: str = Field(..., description="Final grounded answer to the user query")
@@ -35,3 +35,8 @@ class DashboardStats(BaseModel):
     students: int
     faculty: int
     admin: int
+    total_queries: int = 0
+    queries_today: int = 0
+    documents: int = 0
+    ingest_jobs_active: int = 0
+    ingest_jobs_failed: int = 0
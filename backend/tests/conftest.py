@@ -0,0 +1,19 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Settings are read at import time, so the environment is prepared before
+# any application module is imported. Caches and indexes go to a scratch
+# directory instead of dbV2/.
+_scratch = Path(tempfile.mkdtemp(prefix="campusgpt-tests-"))
+
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+os.environ.setdefault("IMAGEKIT_PRIVATE_KEY", "test-key")
+os.environ.setdefault("IMAGEKIT_PUBLIC_KEY", "test-key")
+os.environ.setdefault("IMAGEKIT_URL_ENDPOINT", "https://imagekit.invalid")
+os.environ.setdefault("CHUNK_CACHE_PATH", str(_scratch / "chunk_cache.sqlite3"))
+os.environ.setdefault("LEXICAL_INDEX_PATH", str(_scratch / "lexical_index.sqlite3"))
+os.environ.setdefault("EMBEDDING_CACHE_PATH", str(_scratch / "embedding_cache.sqlite3"))
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,79 @@
+"""
+Answer cache counters and cross-worker invalidation.
+
+Two AnswerCache instances stand in for two uvicorn workers; they share a
+fake `corpus_state` collection the way real workers share Mongo.
+"""
+import asyncio
+
+from retrieval.answer_cache import AnswerCache
+
+PAYLOAD = {"answer": {"answer": "On 12 March.", "citations": []}, "diagram": None}
+
+
+class _CorpusState:
+    def __init__(self):
+        self.documents = {}
+
+    async def find_one(self, query, projection=None):
+        return self.documents.get(query["_id"])
+
+    async def find_one_and_update(self, query, update, upsert, return_document):
+        document = self.documents.setdefault(query["_id"], {"_id": query["_id"], "generation": 0})
+        document["generation"] += update["$inc"]["generation"]
+        return document
+
+
+class _Database:
+    def __init__(self):
+        self.corpus_state = _CorpusState()
+
+
+def _cache() -> AnswerCache:
+    return AnswerCache(max_size=16, ttl_seconds=60, similarity_threshold=0.9)
+
+
+def test_semantic_hit_counts_as_one_hit():
+    cache = _cache()
+    cache.set("When is the SPCC exam?", PAYLOAD, {"exam-timetable"}, embedding=[1.0, 0.0])
+
+    assert cache.get("What date is the SPCC exam on?") is None
+    assert cache.get_similar([0.99, 0.05]) == PAYLOAD
+    assert cache.get("When is the SPCC exam?") == PAYLOAD
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["semantic_hits"]) == (2, 0, 1)
+    assert stats["hit_rate"] == 1.0
+
+
+def test_semantic_miss_counts_as_one_miss():
+    cache = _cache()
+    cache.set("When is the SPCC exam?", PAYLOAD, {"exam-timetable"}, embedding=[1.0, 0.0])
+
+    assert cache.get("Where is the library?") is None
+    assert cache.get_similar([0.0, 1.0]) is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (0, 1, 0.0)
+
+
+def test_ingestion_in_one_worker_invalidates_the_others():
+    db = _Database()
+    worker_a, worker_b = _cache(), _cache()
+
+    async def scenario():
+        generation = await worker_a.sync_generation(db)
+        worker_a.set("When is the SPCC exam?", PAYLOAD, {"exam-timetable"}, generation=generation)
+        assert worker_a.get("When is the SPCC exam?") == PAYLOAD
+
+        # Worker B finishes an ingestion job that touched another document
+        await worker_b.bump_generation(db)
+
+        assert await worker_a.sync_generation(db) == 1
+        assert worker_a.get("When is the SPCC exam?") is None
+
+        # An answer built from the old corpus is not stored afterwards
+        worker_a.set("Where is the library?", PAYLOAD, {"library"}, generation=generation)
+        assert worker_a.get("Where is the library?") is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,141 @@
+"""
+When conversation memory asks for a summary, and what the summary covers.
+
+The Mongo collections are in-memory fakes supporting the queries
+ConversationMemory runs; the LLM call is replaced by a recorder.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from retrieval.conversation_memory import ConversationMemory
+from utils.tokens import estimate_tokens
+
+CONVERSATION = {"conversation_id": "c1", "email": "student@example.edu"}
+START = datetime(2024, 3, 1, 9, 0)
+
+
+class _Cursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def sort(self, field, direction):
+        self.rows.sort(key=lambda row: row[field], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.rows = self.rows[:n]
+        return self
+
+    async def to_list(self, length):
+        return self.rows[:length]
+
+
+def _matches(row: dict, query: dict) -> bool:
+    for field, condition in query.items():
+        value = row.get(field)
+        if isinstance(condition, dict):
+            if "$gt" in condition and not value > condition["$gt"]:
+                return False
+            if "$lt" in condition and not value < condition["$lt"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class _Collection:
+    def __init__(self):
+        self.rows = []
+
+    def find(self, query, projection=None):
+        return _Cursor([dict(row) for row in self.rows if _matches(row, query)])
+
+    async def find_one(self, query, projection=None):
+        return next((dict(row) for row in self.rows if _matches(row, query)), None)
+
+    async def update_one(self, query, update, upsert=False):
+        row = next((row for row in self.rows if _matches(row, query)), None)
+        if row is None:
+            row = dict(query)
+            self.rows.append(row)
+        row.update(update["$set"])
+
+
+class _Database:
+    def __init__(self, turns: int, words: int = 10):
+        self.query_history = _Collection()
+        self.conversation_summaries = _Collection()
+        self.query_history.rows = [
+            {
+                **CONVERSATION,
+                "question": f"question {n} " + "word " * words,
+                "answer": f"answer {n} " + "word " * words,
+                "timestamp": START + timedelta(minutes=n)
+            }
+            for n in range(turns)
+        ]
+
+
+def _memory(max_turns=6, token_budget=1500):
+    memory = ConversationMemory(max_turns, token_budget, summary_tokens=100, summary_batch=20)
+    memory.summarised = []
+
+    async def summarise(previous, turns):
+        memory.summarised.append([turn["question"].split()[1] for turn in turns])
+        return f"summary of {len(turns)} turns"
+
+    memory._summarise = summarise
+    return memory
+
+
+async def _load(memory, db) -> str:
+    context = await memory.load(db, CONVERSATION["conversation_id"], CONVERSATION["email"])
+    await asyncio.gather(*memory._summarising.values())
+    return context
+
+
+def test_no_summary_while_every_turn_is_in_the_prompt():
+    memory, db = _memory(), _Database(turns=4)
+
+    context = asyncio.run(_load(memory, db))
+
+    assert memory.summarised == []
+    assert all(f"question {n} " in context for n in range(4))
+
+
+def test_turns_cut_by_the_budget_are_summarised():
+    db = _Database(turns=4, words=20)
+    turn_tokens = estimate_tokens("User: question 0 " + "word " * 20 + "\nAssistant: answer 0 " + "word " * 20 + "\n")
+    # Room for the two newest turns only, inside a six-turn window
+    memory = _memory(max_turns=6, token_budget=2 * turn_tokens + 5)
+
+    async def scenario():
+        first = await _load(memory, db)
+        second = await _load(memory, db)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert "question 0 " not in first and "question 1 " not in first
+    assert memory.summarised == [["0", "1"]]
+    summary = db.conversation_summaries.rows[0]
+    assert summary["summarised_until"] == START + timedelta(minutes=1)
+
+    # The summary now stands in for the dropped turns, and nothing new
+    # needs summarising. (It takes budget from the kept turns in turn.)
+    assert second.startswith("Summary of earlier conversation:\nsummary of 2 turns")
+    assert "question 3 " in second
+    assert memory.summarised == [["0", "1"]]
+
+
+def test_turns_before_the_window_are_summarised_once():
+    memory, db = _memory(max_turns=3), _Database(turns=10)
+
+    async def scenario():
+        await _load(memory, db)
+        await _load(memory, db)
+
+    asyncio.run(scenario())
+
+    assert memory.summarised == [[str(n) for n in range(7)]]
+    assert db.conversation_summaries.rows[0]["summarised_until"] == START + timedelta(minutes=6)
@@ -0,0 +1,195 @@
+"""
+/health must stay responsive while queries are in flight: every slow call
+on the query path (Gemini, Chroma) is awaited or runs on the bounded
+executor, so it never blocks the event loop.
+
+Gemini and Chroma are replaced by stubs that sleep for a realistic time.
+The Chroma stubs sleep synchronously, as the real client does, so a
+query path that called them inline would stall /health.
+"""
+import asyncio
+import json
+import socket
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import httpx
+import uvicorn
+from langchain_core.documents import Document
+
+import main
+import retrieval.generate_answer as generate_answer
+import retrieval.retrieve_chunks as retrieve_chunks
+import routes.query as query_routes
+import utils.diagram_decision_service as diagram_decision_service
+from schemas.structured_output import StructuredRAGAnswer
+from retrieval.vector_store import VectorStore
+from utils.auth import create_access_token
+
+PENDING_QUERIES = 50
+GEMINI_SECONDS = 0.5
+EMBED_SECONDS = 0.2
+RETRIEVE_SECONDS = 0.5
+MAX_HEALTH_SECONDS = 0.1
+
+
+class _SlowVectorStore(VectorStore):
+    """Chroma and the embedding API as blocking sleeps."""
+
+    def __init__(self):
+        self.persist_dir = "unused"
+
+    def embed_query(self, query: str):
+        time.sleep(EMBED_SECONDS)
+        return [1.0, 0.0, 0.0]
+
+    def retrieve(self, query: str, k: int = 3, where=None):
+        time.sleep(RETRIEVE_SECONDS)
+        return [Document(page_content="stub chunk", metadata={"document_id": "doc-1"})]
+
+
+class _SlowStructuredLLM:
+    async def ainvoke(self, messages):
+        await asyncio.sleep(GEMINI_SECONDS)
+        return StructuredRAGAnswer(answer="stub answer", citations=[], confidence="low")
+
+
+class _SlowGenaiClient:
+    def __init__(self):
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self._generate))
+
+    async def _generate(self, model, contents):
+        await asyncio.sleep(GEMINI_SECONDS)
+        return SimpleNamespace(text=json.dumps({"needs_diagram": False, "diagram_query": ""}))
+
+
+class _Cursor:
+    def sort(self, *args, **kwargs):
+        return self
+
+    def limit(self, *args):
+        return self
+
+    async def to_list(self, length):
+        return []
+
+
+class _Collection:
+    async def insert_one(self, document):
+        return None
+
+    async def find_one(self, *args, **kwargs):
+        return None
+
+    async def update_one(self, *args, **kwargs):
+        return None
+
+    def find(self, *args, **kwargs):
+        return _Cursor()
+
+
+class _Database:
+    def __getattr__(self, name):
+        return _Collection()
+
+
+async def _fake_get_database():
+    return _Database()
+
+
+def _install_stubs(monkeypatch):
+    store = _SlowVectorStore()
+    monkeypatch.setattr(retrieve_chunks.VectorStore, "get_instance", classmethod(lambda cls, *a: store))
+    monkeypatch.setattr(generate_answer, "get_structured_llm", lambda: _SlowStructuredLLM())
+    monkeypatch.setattr(diagram_decision_service, "get_genai_client", lambda: _SlowGenaiClient())
+    monkeypatch.setattr(query_routes, "get_database", _fake_get_database)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def _running_server():
+    """Serves the app from a background thread, as uvicorn would in production."""
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(
+        main.app, host="127.0.0.1", port=port, lifespan="off", log_level="warning"
+    ))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+def _health_latency(client: httpx.Client) -> float:
+    started = time.perf_counter()
+    response = client.get("/health")
+    assert response.status_code == 200
+    return time.perf_counter() - started
+
+
+def _ask_all(base_url: str, headers: dict, answered: list) -> list:
+    """
+    Sends PENDING_QUERIES concurrent queries from a single client thread.
+    One thread per query would compete with the server thread for the GIL
+    and show up as /health latency that a real deployment does not have.
+    """
+    async def ask(client: httpx.AsyncClient, n: int) -> httpx.Response:
+        response = await client.post(
+            "/api/query",
+            json={"question": f"Explain the grading policy, part {n}", "session_id": f"s{n}"},
+            headers=headers
+        )
+        answered.append(n)
+        return response
+
+    async def ask_all():
+        limits = httpx.Limits(max_connections=PENDING_QUERIES)
+        async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+            return await asyncio.gather(*(ask(client, n) for n in range(PENDING_QUERIES)))
+
+    return asyncio.run(ask_all())
+
+
+def test_health_latency_flat_while_queries_pending(monkeypatch):
+    _install_stubs(monkeypatch)
+    token = create_access_token({"sub": "student-1", "role": "student", "email": "student@example.edu"})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with _running_server() as base_url, httpx.Client(base_url=base_url, timeout=60) as client:
+        idle = [_health_latency(client) for _ in range(10)]
+
+        answered = []
+        with ThreadPoolExecutor(max_workers=1) as clients:
+            queries = clients.submit(_ask_all, base_url, headers, answered)
+            time.sleep(0.1)
+            pending_at_start = PENDING_QUERIES - len(answered)
+
+            # Sample /health for as long as any query is pending, so every
+            # stage of the query path is covered
+            loaded = []
+            while not queries.done():
+                loaded.append(_health_latency(client))
+                time.sleep(0.02)
+
+            responses = queries.result()
+
+    assert pending_at_start == PENDING_QUERIES
+    assert len(loaded) >= 20
+    assert max(loaded) < MAX_HEALTH_SECONDS
+    assert statistics.median(loaded) < statistics.median(idle) + 0.02
+
+    assert all(response.status_code == 200 for response in responses)
+    assert all(response.json()["answer"]["answer"] == "stub answer" for response in responses)
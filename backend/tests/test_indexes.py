@@ -0,0 +1,216 @@
+"""
+Index bootstrap checks.
+
+The explain() test needs a MongoDB server. It connects to TEST_MONGO_URL
+(default mongodb://localhost:27017), works in a throwaway database, and is
+skipped when no server answers.
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError
+
+import database
+from config import settings
+
+TEST_MONGO_URL = os.environ.get("TEST_MONGO_URL", "mongodb://localhost:27017")
+
+# One entry per query shape the routes run: (collection, filter, sort)
+ROUTE_QUERIES = {
+    "conversation history": (
+        "query_history",
+        {"conversation_id": "c1", "email": "student@example.edu"},
+        [("timestamp", -1)]
+    ),
+    "student history": (
+        "query_history",
+        {"email": "student@example.edu"},
+        [("timestamp", -1)]
+    ),
+    "queries today": (
+        "query_history",
+        {"timestamp": {"$gte": datetime(2024, 1, 1)}},
+        None
+    ),
+    "conversation summary": (
+        "conversation_summaries",
+        {"conversation_id": "c1", "email": "student@example.edu"},
+        None
+    ),
+    "user by email": ("users", {"email": "student@example.edu"}, None),
+    "user by id": ("users", {"id": "u1"}, None),
+    "users page": (
+        "users",
+        {"$or": [
+            {"created_at": {"$gt": "2024-01-01"}},
+            {"created_at": "2024-01-01", "id": {"$gt": "u1"}}
+        ]},
+        [("created_at", 1), ("id", 1)]
+    ),
+    "events by category and date": (
+        "events",
+        {"category": "exam", "date": {"$gte": "2024-01-01", "$lte": "2024-12-31"}},
+        None
+    ),
+    "upcoming events": ("events", {"date": {"$gte": "2024-01-01"}}, [("date", 1)]),
+    "featured events": (
+        "events",
+        {"is_featured": True, "date": {"$gte": "2024-01-01"}},
+        [("date", 1)]
+    ),
+    "ingest job by id": ("ingest_jobs", {"job_id": "j1"}, None),
+    "queued ingest jobs": ("ingest_jobs", {"status": "queued"}, [("created_at", 1)]),
+    "expired ingest leases": (
+        "ingest_jobs",
+        {"status": "running", "$or": [
+            {"heartbeat_at": {"$lt": datetime(2024, 1, 1)}},
+            {"heartbeat_at": {"$exists": False}}
+        ]},
+        None
+    ),
+    "active job for content": (
+        "ingest_jobs",
+        {"content_hash": "h1", "status": {"$in": ["queued", "running"]}},
+        None
+    ),
+    "active job for document": (
+        "ingest_jobs",
+        {"document_id": "d1", "status": {"$in": ["queued", "running"]}},
+        None
+    ),
+    "document by content hash": ("documents", {"content_hash": "h1"}, None),
+    "document by id": ("documents", {"document_id": "d1"}, None),
+}
+
+
+class _RecordingCollection:
+    def __init__(self, name: str, created: list):
+        self.name = name
+        self.created = created
+
+    async def create_indexes(self, indexes):
+        assert len(indexes) == 1, "indexes must be created one at a time"
+        name = indexes[0].document["name"]
+        if (self.name, name) == ("users", "email"):
+            raise DuplicateKeyError("E11000 duplicate key error")
+        self.created.append((self.name, name))
+
+
+class _RecordingDatabase:
+    def __init__(self):
+        self.created = []
+
+    def __getitem__(self, collection):
+        return _RecordingCollection(collection, self.created)
+
+
+class _RecordingClient:
+    def __init__(self):
+        self.database = _RecordingDatabase()
+
+    def __getitem__(self, db_name):
+        return self.database
+
+
+def test_failing_unique_index_does_not_block_the_others(monkeypatch):
+    client = _RecordingClient()
+    monkeypatch.setattr(database.db, "client", client)
+
+    asyncio.run(database.ensure_indexes())
+
+    created = client.database.created
+    expected = {
+        (collection, index.document["name"])
+        for collection, indexes in database.INDEXES.items()
+        for index in indexes
+    }
+    assert set(created) == expected - {("users", "email")}
+    # The other users indexes come after the failing one
+    assert ("users", "id") in created
+    assert ("users", "created_at_id") in created
+
+
+def _stages(plan: dict):
+    yield plan.get("stage", "")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+async def _seed(test_db):
+    now = datetime.utcnow()
+    await test_db.query_history.insert_many([
+        {"conversation_id": f"c{n % 5}", "email": f"user{n % 7}@example.edu", "timestamp": now - timedelta(minutes=n)}
+        for n in range(50)
+    ])
+    await test_db.conversation_summaries.insert_one({"conversation_id": "c1", "email": "student@example.edu"})
+    await test_db.users.insert_many([
+        {"id": f"u{n}", "email": f"user{n}@example.edu", "role": "student", "created_at": f"2024-01-{n % 28 + 1:02d}"}
+        for n in range(50)
+    ])
+    await test_db.events.insert_many([
+        {"category": ["exam", "fest"][n % 2], "is_featured": n % 3 == 0, "date": f"2024-{n % 12 + 1:02d}-10"}
+        for n in range(50)
+    ])
+    await test_db.ingest_jobs.insert_many([
+        {
+            "job_id": f"j{n}",
+            "document_id": f"d{n % 10}",
+            "content_hash": f"h{n % 10}",
+            "status": ["queued", "running", "completed", "failed"][n % 4],
+            "created_at": now - timedelta(minutes=n),
+            "heartbeat_at": now - timedelta(minutes=n)
+        }
+        for n in range(50)
+    ])
+    await test_db.documents.insert_many([
+        {"document_id": f"d{n}", "content_hash": f"h{n}"}
+        for n in range(10)
+    ])
+
+
+async def _winning_stages(test_db, collection, query_filter, sort):
+    command = {"find": collection, "filter": query_filter, "limit": 50}
+    if sort:
+        command["sort"] = dict(sort)
+    explained = await test_db.command({"explain": command, "verbosity": "queryPlanner"})
+    return list(_stages(explained["queryPlanner"]["winningPlan"]))
+
+
+async def _explain_route_queries(monkeypatch):
+    client = AsyncIOMotorClient(TEST_MONGO_URL, serverSelectionTimeoutMS=500)
+    try:
+        await client.admin.command("ping")
+    except Exception:
+        client.close()
+        pytest.skip(f"No MongoDB server at {TEST_MONGO_URL}")
+
+    db_name = f"campusgpt_index_test_{uuid.uuid4().hex[:8]}"
+    monkeypatch.setattr(database.db, "client", client)
+    monkeypatch.setattr(settings, "DB_NAME", db_name)
+    try:
+        test_db = client[db_name]
+        await _seed(test_db)
+        await database.ensure_indexes()
+        return {
+            name: await _winning_stages(test_db, collection, query_filter, sort)
+            for name, (collection, query_filter, sort) in ROUTE_QUERIES.items()
+        }
+    finally:
+        await client.drop_database(db_name)
+        client.close()
+
+
+def test_route_queries_use_an_index(monkeypatch):
+    plans = asyncio.run(_explain_route_queries(monkeypatch))
+
+    for name, stages in plans.items():
+        assert any("IXSCAN" in stage for stage in stages), f"{name}: {stages}"
+        assert "COLLSCAN" not in stages, f"{name}: {stages}"
+        assert "SORT" not in stages, f"{name} sorts in memory: {stages}"
@@ -0,0 +1,153 @@
+"""
+Content-hash deduplication of new-document uploads.
+
+The collections are in-memory fakes that yield to the event loop on
+every call, so concurrent claims interleave the way they do against
+Mongo, and that enforce the unique `_id` the real claim relies on.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+import ingestion.job_queue as job_queue
+from ingestion.job_queue import IngestionJobQueue
+
+FILE_HASH = "9f2c41d0"
+
+
+def _matches(row: dict, query: dict) -> bool:
+    for field, condition in query.items():
+        if isinstance(condition, dict) and "$in" in condition:
+            if row.get(field) not in condition["$in"]:
+                return False
+        elif row.get(field) != condition:
+            return False
+    return True
+
+
+class _Collection:
+    def __init__(self):
+        self.rows = []
+
+    async def insert_one(self, document):
+        await asyncio.sleep(0)
+        if "_id" in document and any(row.get("_id") == document["_id"] for row in self.rows):
+            raise DuplicateKeyError("E11000 duplicate key error")
+        self.rows.append(dict(document))
+
+    async def find_one(self, query, projection=None):
+        await asyncio.sleep(0)
+        return next((dict(row) for row in self.rows if _matches(row, query)), None)
+
+    async def replace_one(self, query, document):
+        await asyncio.sleep(0)
+        for index, row in enumerate(self.rows):
+            if _matches(row, query):
+                self.rows[index] = dict(document)
+                return type("Result", (), {"modified_count": 1})()
+        return type("Result", (), {"modified_count": 0})()
+
+    async def delete_one(self, query):
+        await asyncio.sleep(0)
+        self.rows = [row for row in self.rows if not _matches(row, query)]
+
+
+class _Database:
+    def __init__(self):
+        self.content_claims = _Collection()
+        self.ingest_jobs = _Collection()
+        self.documents = _Collection()
+
+
+@pytest.fixture
+def db(monkeypatch):
+    database = _Database()
+
+    async def get_database():
+        return database
+
+    monkeypatch.setattr(job_queue, "get_database", get_database)
+    return database
+
+
+def _claim(queue, job_id: str):
+    return queue.claim_content(FILE_HASH, job_id, f"doc-{job_id}", "timetable.pdf")
+
+
+def test_only_one_concurrent_upload_claims_the_content(db):
+    queue = IngestionJobQueue(concurrency=1)
+
+    async def upload_all():
+        return await asyncio.gather(*(_claim(queue, f"job-{n}") for n in range(5)))
+
+    results = asyncio.run(upload_all())
+
+    winners = [n for n, duplicate in enumerate(results) if duplicate is None]
+    assert len(winners) == 1
+    winner = f"job-{winners[0]}"
+    for duplicate in results:
+        if duplicate is not None:
+            assert duplicate["job_id"] == winner
+            assert duplicate["status"] == "queued"
+            assert duplicate["document_name"] == "timetable.pdf"
+
+
+def test_released_claim_can_be_taken(db):
+    queue = IngestionJobQueue(concurrency=1)
+
+    async def scenario():
+        assert await _claim(queue, "job-a") is None
+        await queue.release_content(FILE_HASH, "job-a")
+        assert await _claim(queue, "job-b") is None
+
+    asyncio.run(scenario())
+    assert db.content_claims.rows[0]["job_id"] == "job-b"
+
+
+@pytest.mark.parametrize("status, document_hash", [
+    ("failed", None),
+    # The document was replaced with other content since
+    ("completed", "7a11be03"),
+])
+def test_stale_claim_is_taken_over(db, status, document_hash):
+    queue = IngestionJobQueue(concurrency=1)
+    db.ingest_jobs.rows.append({"job_id": "job-a", "content_hash": FILE_HASH, "status": status})
+    if document_hash:
+        db.documents.rows.append({"document_id": "doc-job-a", "content_hash": document_hash})
+
+    async def scenario():
+        assert await _claim(queue, "job-a") is None
+        assert await _claim(queue, "job-b") is None
+
+    asyncio.run(scenario())
+    assert [row["job_id"] for row in db.content_claims.rows] == ["job-b"]
+
+
+def test_ingested_document_and_active_job_are_duplicates(db):
+    queue = IngestionJobQueue(concurrency=1)
+    db.documents.rows.append({
+        "document_id": "doc-1", "content_hash": FILE_HASH, "document_name": "timetable.pdf"
+    })
+    db.ingest_jobs.rows.append({"job_id": "job-x", "content_hash": "5e5e", "status": "running"})
+
+    duplicate = asyncio.run(_claim(queue, "job-b"))
+    assert duplicate["status"] == "completed"
+    assert duplicate["document_id"] == "doc-1"
+
+    duplicate = asyncio.run(queue.claim_content("5e5e", "job-c", "doc-c", "notes.pdf"))
+    assert duplicate["job_id"] == "job-x"
+
+
+def test_claim_of_an_upload_that_never_queued_expires(db):
+    queue = IngestionJobQueue(concurrency=1)
+    db.content_claims.rows.append({
+        "_id": FILE_HASH,
+        "job_id": "job-a",
+        "document_id": "doc-a",
+        "document_name": "timetable.pdf",
+        "claimed_at": datetime.utcnow() - timedelta(hours=1)
+    })
+
+    assert asyncio.run(_claim(queue, "job-b")) is None
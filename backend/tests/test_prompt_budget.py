@@ -0,0 +1,241 @@
+"""
+Prompt size and budgeting of build_structured_prompt.
+
+`_legacy_build_structured_prompt` is the builder as it was before the
+token budget (metadata repeated per chunk, no truncation), kept here
+verbatim so both can be run on the same chunks.
+"""
+from langchain_core.documents import Document
+
+from retrieval.prompt_builder import (
+    MIN_CHUNK_TOKENS,
+    build_structured_prompt,
+    is_followup_question,
+)
+from utils.tokens import estimate_tokens
+
+QUERY = "When is the SPCC end semester exam?"
+LARGE_BUDGET = 100_000
+
+
+def _legacy_build_structured_prompt(chunks, query: str, conversation_context: str = ""):
+    is_followup = is_followup_question(query)
+
+    prompt = """
+You are CampusGPT, a retrieval-augmented conversational question answering system.
+"""
+
+    if is_followup and conversation_context.strip():
+        prompt += """
+
+This question appears to be a follow-up to previous conversation.
+
+PRIORITY ORDER:
+
+1. First check if document excerpts contain relevant information.
+2. If NOT, you MAY answer using previous conversation context.
+3. Do NOT use external knowledge.
+4. Never fabricate information.
+
+MEMORY RULES:
+
+- If answer is derived ONLY from previous conversation → citations MUST be [].
+- If answer is derived from document excerpts → citations are REQUIRED.
+- Never cite previous conversation.
+"""
+    else:
+        prompt += """
+
+STRICT MODE:
+
+You MUST answer using ONLY the provided document excerpts.
+Do NOT use previous conversation for answering.
+Do NOT use external knowledge.
+If answer is not found in excerpts, say information is not available.
+
+Citations are REQUIRED.
+"""
+
+    if is_followup and conversation_context.strip():
+        prompt += f"""
+
+PREVIOUS CONVERSATION (For context only — NOT for citation)
+{conversation_context}
+"""
+
+    prompt += f"""
+
+QUESTION
+{query}
+
+DOCUMENT EXCERPTS
+"""
+
+    for i, chunk in enumerate(chunks, start=1):
+        location = "".join(
+            f"{key}: {chunk.metadata[key]}\n"
+            for key in ("page", "slide", "heading")
+            if chunk.metadata.get(key) is not None
+        )
+        prompt += f"""
+--- CHUNK {i} ---
+document_name: {chunk.metadata.get("document_name")}
+document_id: {chunk.metadata.get("document_id")}
+chunk_index: {chunk.metadata.get("chunk_index")}
+document_url: {chunk.metadata.get("document_url")}
+uploaded_by: {chunk.metadata.get("uploader", "")}
+{location}
+content:
+{chunk.page_content}
+"""
+
+    prompt += """
+
+OUTPUT FORMAT (JSON ONLY)
+
+{
+  "answer": "string",
+  "citations": [
+    {
+      "document_name": "string",
+      "document_id": "string",
+      "chunk_index": number,
+      "document_url": "string",
+      "uploaded_by": "string",
+      "page": number | null,
+      "slide": number | null
+    }
+  ],
+  "confidence": "high | medium | low"
+}
+
+FINAL RULES:
+
+- If answer is based ONLY on memory → citations MUST be [].
+- If answer is based on document excerpts → citations MUST follow uniqueness rules.
+- Never mix memory facts with document citations.
+- Copy page / slide from the cited chunk; use null when the chunk has none.
+- Output ONLY valid JSON.
+"""
+
+    return prompt
+
+
+def _chunk(document: str, index: int, words: int, page=None) -> Document:
+    return Document(
+        page_content=" ".join(f"{document}-{index}-w{n}" for n in range(words)),
+        metadata={
+            "document_name": f"{document}.pdf",
+            "document_id": f"{document}-0b7e4c2a9f",
+            "chunk_index": index,
+            "document_url": f"https://ik.imagekit.io/campusgpt/{document}.pdf",
+            "uploader": "faculty@example.edu",
+            "page": page,
+        }
+    )
+
+
+def _chunks():
+    # Ranked best first; most chunks share a document, as top-k hits usually do
+    return [
+        _chunk("exam-timetable", 0, 60, page=1),
+        _chunk("exam-timetable", 1, 60, page=2),
+        _chunk("exam-timetable", 2, 60, page=2),
+        _chunk("notices", 0, 60),
+        _chunk("exam-timetable", 3, 60, page=3),
+    ]
+
+
+def _budget_for(chunks, extra: int) -> int:
+    """A budget `extra` tokens above what `chunks` need on their own."""
+    return estimate_tokens(build_structured_prompt(chunks, QUERY, token_budget=LARGE_BUDGET)) + extra
+
+
+def test_new_prompt_is_smaller_for_the_same_chunks():
+    chunks = _chunks()
+    legacy = _legacy_build_structured_prompt(chunks, QUERY)
+    prompt = build_structured_prompt(chunks, QUERY, token_budget=LARGE_BUDGET)
+
+    for chunk in chunks:
+        assert chunk.page_content in legacy
+        assert chunk.page_content in prompt
+
+    # Per-chunk metadata blocks become one SOURCES line per document
+    assert prompt.count("exam-timetable-0b7e4c2a9f") == 1
+    assert legacy.count("exam-timetable-0b7e4c2a9f") == 4
+    assert estimate_tokens(prompt) < estimate_tokens(legacy)
+
+
+def test_follow_up_prompt_is_smaller_for_the_same_chunks():
+    chunks = _chunks()
+    query = "Can you elaborate on what you said about the SPCC exam?"
+    memory = "User: When is the SPCC exam?\nAssistant: On 12 March in room B-204."
+
+    legacy = _legacy_build_structured_prompt(chunks, query, memory)
+    prompt = build_structured_prompt(chunks, query, memory, token_budget=LARGE_BUDGET)
+
+    assert memory in prompt
+    assert estimate_tokens(prompt) < estimate_tokens(legacy)
+
+
+def test_prompt_stays_within_budget():
+    chunks = [_chunk("handbook", index, 100) for index in range(20)]
+    legacy_tokens = estimate_tokens(_legacy_build_structured_prompt(chunks, QUERY))
+
+    excerpts = 0
+    for budget in (1000, 2000, 4000):
+        assert budget < legacy_tokens
+        prompt = build_structured_prompt(chunks, QUERY, token_budget=budget)
+        assert estimate_tokens(prompt) <= budget
+        assert chunks[0].page_content in prompt
+        assert prompt.count("--- EXCERPT ") > excerpts
+        excerpts = prompt.count("--- EXCERPT ")
+
+
+def test_first_chunk_that_does_not_fit_is_truncated_and_the_rest_dropped():
+    chunks = _chunks()
+    # Room for chunk 0 plus a partial chunk 1
+    budget = _budget_for(chunks[:1], MIN_CHUNK_TOKENS + 60)
+
+    prompt = build_structured_prompt(chunks, QUERY, token_budget=budget)
+
+    assert estimate_tokens(prompt) <= budget
+    assert chunks[0].page_content in prompt
+    assert chunks[1].page_content not in prompt
+    # A word-boundary prefix of chunk 1 is kept
+    assert "exam-timetable-1-w0 " in prompt
+    assert "...\n\n" in prompt
+    assert "--- EXCERPT 2 ---" in prompt
+    assert "--- EXCERPT 3 ---" not in prompt
+    # Lower-ranked chunks stay out even if one of them would still fit
+    for chunk in chunks[2:]:
+        assert chunk.page_content.split()[0] + " " not in prompt
+    assert "notices-0b7e4c2a9f" not in prompt
+
+
+def test_chunk_dropped_when_too_little_room_is_left():
+    chunks = _chunks()
+    # Less than MIN_CHUNK_TOKENS left after chunk 0: no stub of chunk 1
+    budget = _budget_for(chunks[:1], MIN_CHUNK_TOKENS // 2)
+
+    prompt = build_structured_prompt(chunks, QUERY, token_budget=budget)
+
+    assert estimate_tokens(prompt) <= budget
+    assert chunks[0].page_content in prompt
+    assert "--- EXCERPT 2 ---" not in prompt
+    assert "exam-timetable-1-w0" not in prompt
+    assert "notices-0b7e4c2a9f" not in prompt
+
+
+def test_whole_chunks_are_kept_when_they_fit():
+    chunks = _chunks()
+    # Per-part estimates round up, so allow a little slack over the
+    # whole-prompt estimate, but far less than MIN_CHUNK_TOKENS
+    budget = _budget_for(chunks[:3], 20)
+
+    prompt = build_structured_prompt(chunks, QUERY, token_budget=budget)
+
+    for chunk in chunks[:3]:
+        assert chunk.page_content in prompt
+    assert "..." not in prompt
+    assert "--- EXCERPT 4 ---" not in prompt
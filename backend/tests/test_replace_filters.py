@@ -0,0 +1,94 @@
+"""
+Metadata filters after a document is re-ingested in replace mode.
+
+Unchanged chunks are kept rather than re-embedded, but their metadata
+(here `uploaded_at`) is rewritten. Both Chroma and the BM25 index must
+see the new values, or filtered hybrid retrieval fuses two rankings
+over different candidate sets.
+"""
+import hashlib
+import math
+
+import pytest
+
+import ingestion.utils as ingest_utils
+import retrieval.vector_store as vector_store
+from retrieval.lexical_index import LexicalIndex
+
+DOCUMENT_ID = "hostel-rules-5d1c"
+SECTIONS = [
+    {"text": "Hostel room allotment requests go to the warden before the semester starts.", "page": 1},
+    {"text": "Visitors must sign the register at the hostel gate and leave by evening.", "page": 2},
+]
+QUERY = "who handles hostel room allotment with the warden"
+FIRST_UPLOAD = 1_700_000_000
+SECOND_UPLOAD = 1_710_000_000
+
+
+class HashedEmbeddings:
+    """Deterministic bag-of-words vectors; no network."""
+
+    dimensions = 32
+
+    def _embed(self, text):
+        vector = [0.0] * self.dimensions
+        for word in text.lower().split():
+            vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dimensions] += 1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+@pytest.fixture
+def persist_dir(tmp_path, monkeypatch):
+    embeddings = HashedEmbeddings()
+    lexical = LexicalIndex(str(tmp_path / "lexical.sqlite3"))
+    monkeypatch.setattr(vector_store, "get_embeddings", lambda: embeddings)
+    monkeypatch.setattr(ingest_utils, "get_embeddings", lambda: embeddings)
+    monkeypatch.setattr(vector_store, "lexical_index", lexical)
+    monkeypatch.setattr(ingest_utils, "lexical_index", lexical)
+    return str(tmp_path / "chroma")
+
+
+def _ingest(persist_dir: str, uploaded_at: int, replace: bool):
+    documents = ingest_utils.summarise_chunks(
+        list(ingest_utils.iter_chunks(SECTIONS)),
+        document_id=DOCUMENT_ID,
+        document_name="hostel-rules.pdf",
+        document_url="",
+        uploader={"email": "warden@example.edu"},
+        uploaded_at=uploaded_at
+    )
+    existing_ids = (
+        ingest_utils.get_document_chunk_ids(DOCUMENT_ID, persist_dir)
+        if replace else set()
+    )
+    return ingest_utils.create_vector_store(documents, persist_dir, existing_ids=existing_ids)
+
+
+def test_kept_chunks_match_new_filters_in_both_indexes(persist_dir):
+    _ingest(persist_dir, FIRST_UPLOAD, replace=False)
+    written = _ingest(persist_dir, SECOND_UPLOAD, replace=True)
+    assert written == {"added": 0, "kept": len(SECTIONS)}
+
+    store = vector_store.VectorStore.get_instance(persist_dir)
+    lexical = vector_store.lexical_index
+    after = vector_store.build_where(uploaded_after=SECOND_UPLOAD)
+    before = vector_store.build_where(uploaded_before=FIRST_UPLOAD)
+
+    chroma_ids = set(store.db._collection.get(where=after, include=[])["ids"])
+    lexical_ids = {chunk_id for chunk_id, _ in lexical.search(QUERY, 10, after)}
+    assert len(chroma_ids) == len(SECTIONS)
+    assert lexical_ids == chroma_ids
+
+    assert store.db._collection.get(where=before, include=[])["ids"] == []
+    assert lexical.search(QUERY, 10, before) == []
+
+    retrieved = store.retrieve(QUERY, k=1, where=after)
+    assert [doc.metadata["uploaded_at"] for doc in retrieved] == [SECOND_UPLOAD]
+    assert "allotment" in retrieved[0].page_content
@@ -0,0 +1,127 @@
+"""
+recall@k of hybrid retrieval on a small fixed campus corpus.
+
+The store is a real Chroma collection and BM25 index in a temporary
+directory. Embeddings come from `ConceptEmbeddings`, a deterministic
+stand-in that, like a real embedding model, captures topics and synonyms
+but not identifiers: "SPCC", "DSA" and "B-204" carry no signal in it.
+Exam chunks for different subjects therefore embed identically, which
+is the failure hybrid retrieval exists to fix.
+"""
+import math
+
+import pytest
+
+import retrieval.vector_store as vector_store
+from retrieval.lexical_index import LexicalIndex, tokenize
+
+K = 3
+
+# Concept dimensions and the words that activate them
+CONCEPTS = [
+    {"exam", "exams", "examination", "paper"},
+    {"timetable", "schedule", "date", "dates", "when", "time"},
+    {"library", "books", "book", "borrow"},
+    {"hostel", "accommodation", "warden", "allotment"},
+    {"fee", "fees", "payment", "pay", "tuition"},
+    {"lab", "laboratory", "practical", "practicals"},
+    {"holiday", "holidays", "vacation", "break"},
+    {"placement", "placements", "internship", "recruitment", "companies"},
+    {"result", "results", "grades", "marks"},
+]
+
+CORPUS = {
+    "exam-spcc": "SPCC end semester exam is on 12 March in room B-204.",
+    "exam-dsa": "DSA end semester exam is on 14 March in room B-210.",
+    "exam-cn": "CN end semester exam is on 16 March in room A-101.",
+    "exam-timetable": "The exam timetable lists the date and time of every exam; the schedule is final.",
+    "exam-schedule-changes": "Exam schedule changes and new exam dates are announced on the notice board.",
+    "exam-results": "Exam results and marks are published two weeks after the last exam.",
+    "library": "The central library opens at 8 am. Students can borrow four books at a time.",
+    "hostel": "Hostel room allotment and accommodation requests are handled by the warden.",
+    "fees": "The tuition fee payment deadline is 30 June; late payment attracts a fine.",
+    "lab": "Computer lab practical sessions run Monday to Friday in the laboratory block.",
+    "holiday": "The Diwali vacation break runs from 1 to 7 November.",
+    "placement": "The placement cell runs internship and recruitment drives with companies.",
+}
+
+# (question, chunk that answers it)
+QUESTIONS = [
+    ("When is the SPCC exam?", "exam-spcc"),
+    ("Which room is the DSA exam in, and what time does it start?", "exam-dsa"),
+    ("Where is the CN paper held?", "exam-cn"),
+    ("How many books can I borrow from the library?", "library"),
+    ("When is the tuition fee payment due?", "fees"),
+    ("How long is the vacation break?", "holiday"),
+    ("Who handles hostel accommodation?", "hostel"),
+    ("Are there internship opportunities through placements?", "placement"),
+]
+
+
+class ConceptEmbeddings:
+    """Bag of concepts, L2-normalised, with a small constant component."""
+
+    def _embed(self, text):
+        words = tokenize(text)
+        vector = [0.1] + [float(sum(word in concept for word in words)) for concept in CONCEPTS]
+        norm = math.sqrt(sum(value * value for value in vector))
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    embeddings = ConceptEmbeddings()
+    lexical = LexicalIndex(str(tmp_path / "lexical.sqlite3"))
+    monkeypatch.setattr(vector_store, "get_embeddings", lambda: embeddings)
+    monkeypatch.setattr(vector_store, "lexical_index", lexical)
+
+    store = vector_store.VectorStore(str(tmp_path / "chroma"))
+    ids = list(CORPUS)
+    metadatas = [{"chunk": chunk, "document_id": "handbook"} for chunk in ids]
+    store.db._collection.upsert(
+        ids=ids,
+        documents=[CORPUS[chunk] for chunk in ids],
+        embeddings=embeddings.embed_documents([CORPUS[chunk] for chunk in ids]),
+        metadatas=metadatas
+    )
+    lexical.upsert(zip(ids, (CORPUS[chunk] for chunk in ids), metadatas))
+    return store
+
+
+def _recall_at_k(search) -> float:
+    found = 0
+    for question, expected in QUESTIONS:
+        retrieved = [doc.metadata["chunk"] for doc in search(question)]
+        assert len(retrieved) <= K
+        found += expected in retrieved
+    return found / len(QUESTIONS)
+
+
+def test_hybrid_recall_at_k(store):
+    hybrid = _recall_at_k(lambda q: store.retrieve(q, k=K))
+    vector_only = _recall_at_k(
+        lambda q: store.retrieve_by_vector(store.embed_query(q), k=K)
+    )
+
+    assert hybrid == 1.0
+    # The subject-code questions are the ones dense retrieval alone misses
+    assert vector_only < hybrid
+
+
+def test_fused_relevance_ranks_the_lexical_match_high(store):
+    # Not every term occurs in one chunk, so this goes through RRF + MMR
+    # rather than the lexical-only path. With cosine relevance, the two
+    # exam-schedule chunks outranked the DSA chunk; with the fused score
+    # only the timetable chunk, which matches "exam" and "time" in both
+    # rankings, stays ahead of it.
+    question = "Which room is the DSA exam in, and what time does it start?"
+    retrieved = [doc.metadata["chunk"] for doc in store.retrieve(question, k=K)]
+
+    assert retrieved.index("exam-dsa") <= 1
+    assert "exam-schedule-changes" not in retrieved[:2]
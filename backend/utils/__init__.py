@@ -1,8 +1,13 @@
 from .auth import (
     hash_password,
     verify_password,
+    ahash_password,
+    averify_password,
     create_access_token,
     get_current_user,
+    get_cached_profile,
+    cache_profile,
+    invalidate_user_profile,
     require_role,
     security
 )
@@ -10,8 +15,13 @@ from .auth import (
 __all__ = [
     "hash_password",
     "verify_password",
+    "ahash_password",
+    "averify_password",
     "create_access_token",
     "get_current_user",
+    "get_cached_profile",
+    "cache_profile",
+    "invalidate_user_profile",
     "require_role",
     "security"
 ]
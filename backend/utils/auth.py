@@ -1,5 +1,6 @@
+import time
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 from fastapi import HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -8,9 +9,23 @@ import jwt
 from jwt import ExpiredSignatureError, PyJWTError as JWTError
 import bcrypt
 from config import settings
+from utils.cache import TTLCache
+from utils.concurrency import run_password_hashing
 
 security = HTTPBearer()
 
+# token -> verified claims; each entry expires no later than the token itself
+token_cache = TTLCache(
+    max_size=settings.TOKEN_CACHE_SIZE,
+    ttl_seconds=settings.TOKEN_CACHE_TTL_SECONDS
+)
+
+# user id -> /auth/me profile
+profile_cache = TTLCache(
+    max_size=settings.USER_PROFILE_CACHE_SIZE,
+    ttl_seconds=settings.USER_PROFILE_CACHE_TTL_SECONDS
+)
+
 
 # ==========================
 # 🔑 PASSWORD FUNCTIONS
@@ -24,7 +39,7 @@ def hash_password(password: str) -> str:
         password_bytes = password_bytes[:72]
     
     # Generate salt and hash
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
@@ -40,6 +55,16 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(password_bytes, hashed_password.encode('utf-8'))
 
 
+async def ahash_password(password: str) -> str:
+    """Async variant of `hash_password` that keeps bcrypt off the event loop."""
+    return await run_password_hashing(hash_password, password)
+
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    """Async variant of `verify_password` that keeps bcrypt off the event loop."""
+    return await run_password_hashing(verify_password, plain_password, hashed_password)
+
+
 # ==========================
 # 🔐 JWT TOKEN FUNCTIONS
 # ==========================
@@ -67,6 +92,47 @@ def create_access_token(data: Dict) -> str:
 # 👤 GET CURRENT USER
 # ==========================
 
+def _verify_token(token: str) -> Dict:
+    """
+    Decodes and validates a token, reusing the claims of a token verified
+    before. Cached claims expire at the token's `exp`, so an expired token
+    always reaches jwt.decode and is rejected there.
+    """
+    claims = token_cache.get(token)
+    if claims is not None:
+        return dict(claims)
+
+    payload = jwt.decode(
+        token,
+        settings.JWT_SECRET_KEY,
+        algorithms=[settings.JWT_ALGORITHM]
+    )
+
+    user_id: str = payload.get("sub")
+    role: str = payload.get("role")
+    email: str = payload.get("email")
+
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials"
+        )
+
+    claims = {
+        "user_id": user_id,
+        "role": role,
+        "email": email
+    }
+
+    ttl = settings.TOKEN_CACHE_TTL_SECONDS
+    if payload.get("exp") is not None:
+        ttl = min(ttl, float(payload["exp"]) - time.time())
+    if ttl > 0:
+        token_cache.set(token, claims, ttl=ttl)
+
+    return dict(claims)
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> Dict:
@@ -75,27 +141,7 @@ async def get_current_user(
     token = credentials.credentials
 
     try:
-        payload = jwt.decode(
-            token,
-            settings.JWT_SECRET_KEY,
-            algorithms=[settings.JWT_ALGORITHM]
-        )
-
-        user_id: str = payload.get("sub")
-        role: str = payload.get("role")
-        email: str = payload.get("email")
-
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials"
-            )
-
-        return {
-            "user_id": user_id,
-            "role": role,
-            "email": email
-        }
+        return _verify_token(token)
 
     except ExpiredSignatureError:
         raise HTTPException(
@@ -110,6 +156,24 @@ async def get_current_user(
         )
 
 
+# ==========================
+# 🗂 USER PROFILE CACHE
+# ==========================
+
+def get_cached_profile(user_id: str) -> Optional[Dict]:
+    profile = profile_cache.get(user_id)
+    return dict(profile) if profile is not None else None
+
+
+def cache_profile(user_id: str, profile: Dict):
+    profile_cache.set(user_id, dict(profile))
+
+
+def invalidate_user_profile(user_id: str):
+    """Call after changing a user document so /auth/me is not stale."""
+    profile_cache.pop(user_id)
+
+
 # ==========================
 # 🛡 ROLE BASED ACCESS
 # ==========================
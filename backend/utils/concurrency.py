@@ -0,0 +1,42 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from config import settings
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.BLOCKING_IO_WORKERS,
+    thread_name_prefix="campusgpt-io"
+)
+
+# bcrypt is CPU-bound and releases the GIL, so it gets its own small pool:
+# a login storm is capped at PASSWORD_HASH_WORKERS hashes at once and
+# cannot occupy the threads the query path uses for I/O.
+_password_executor = ThreadPoolExecutor(
+    max_workers=max(1, settings.PASSWORD_HASH_WORKERS),
+    thread_name_prefix="campusgpt-bcrypt"
+)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Runs a blocking callable on the shared bounded executor so it does not
+    stall the event loop. The pool size caps how many blocking calls a
+    worker process can have in flight at once.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _executor,
+        functools.partial(func, *args, **kwargs)
+    )
+
+
+async def run_password_hashing(func, *args):
+    """Runs a bcrypt call on the dedicated password-hashing executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, func, *args)
+
+
+def shutdown_executor():
+    _executor.shutdown(wait=False, cancel_futures=True)
+    _password_executor.shutdown(wait=False, cancel_futures=True)
@@ -1,4 +1,7 @@
+import json
+
 from config import settings
+from utils.llm_clients import get_genai_client
 
 
 class DiagramDecisionService:
@@ -6,10 +9,8 @@ class DiagramDecisionService:
     Decides whether diagram is needed and generates a standardized diagram query.
     """
 
-    def decide(self, user_query: str) -> dict:
-        client = settings.get_gemini_client()
-
-        prompt = f"""
+    def _build_prompt(self, user_query: str) -> str:
+        return f"""
 You are an intelligent system that decides whether a diagram is needed.
 
 Rules:
@@ -43,17 +44,35 @@ User Query:
 \"\"\"{user_query}\"\"\"
 """
 
-        response = client.models.generate_content(
-            model=settings.GEMINI_MODEL,
-            contents=prompt
-        )
-
-        text = response.text.strip()
+    def _parse(self, text: str) -> dict:
+        text = text.strip()
 
         # simple JSON extraction
         start = text.find("{")
         end = text.rfind("}")
         json_text = text[start:end+1]
 
-        import json
         return json.loads(json_text)
+
+    def decide(self, user_query: str) -> dict:
+        client = get_genai_client()
+
+        response = client.models.generate_content(
+            model=settings.GEMINI_MODEL,
+            contents=self._build_prompt(user_query)
+        )
+
+        return self._parse(response.text)
+
+    async def adecide(self, user_query: str) -> dict:
+        """
+        Async variant of `decide` using the Gemini SDK's async client.
+        """
+        client = get_genai_client()
+
+        response = await client.aio.models.generate_content(
+            model=settings.GEMINI_MODEL,
+            contents=self._build_prompt(user_query)
+        )
+
+        return self._parse(response.text)
@@ -31,53 +31,83 @@ class DiagramService:
 
         return diagram_code
 
-    def generate_diagram(self, user_query: str, chunks: str) -> dict:
-        """
-        Main function to generate explanation + Mermaid diagram.
-        """
-
+    def _check_query(self, user_query: str):
         if not user_query or len(user_query.strip()) < 3:
             return {
                 "success": False,
                 "error": "Query too short. Please provide a meaningful query."
             }
+        return None
 
-        try:
-            # 1️⃣ Build Prompt
-            prompt = build_diagram_prompt(user_query, chunks)
-
-            # 2️⃣ Call LLM
-            raw_output = self.llm_service.generate(prompt)
+    def _build_result(self, raw_output: dict) -> dict:
+        # 3️⃣ Validate JSON structure
+        validated = DiagramResponse(**raw_output)
 
-            # 3️⃣ Validate JSON structure
-            validated = DiagramResponse(**raw_output)
+        # 4️⃣ Validate Mermaid structure
+        validated.diagram = self._validate_mermaid(validated.diagram)
 
-            # 4️⃣ Validate Mermaid structure
-            validated.diagram = self._validate_mermaid(validated.diagram)
+        return {
+            "success": True,
+            "explanation": validated.explanation,
+            "diagram": validated.diagram
+        }
 
-            return {
-                "success": True,
-                "explanation": validated.explanation,
-                "diagram": validated.diagram
-            }
-
-        except ValidationError as ve:
+    def _error_result(self, error: Exception) -> dict:
+        if isinstance(error, ValidationError):
             return {
                 "success": False,
                 "error": "Invalid response structure from model.",
-                "details": str(ve)
+                "details": str(error)
             }
 
-        except ValueError as ve:
+        if isinstance(error, ValueError):
             return {
                 "success": False,
-                "error": str(ve)
+                "error": str(error)
             }
 
+        return {
+            "success": False,
+            "error": "Unexpected server error.",
+            "details": str(error)
+        }
+
+    def generate_diagram(self, user_query: str, chunks: str) -> dict:
+        """
+        Main function to generate explanation + Mermaid diagram.
+        """
+
+        invalid = self._check_query(user_query)
+        if invalid:
+            return invalid
+
+        try:
+            # 1️⃣ Build Prompt
+            prompt = build_diagram_prompt(user_query, chunks)
+
+            # 2️⃣ Call LLM
+            raw_output = self.llm_service.generate(prompt)
+
+            return self._build_result(raw_output)
+
         except Exception as e:
-            return {
-                "success": False,
-                "error": "Unexpected server error.",
-                "details": str(e)
-            }
+            return self._error_result(e)
 
+    async def agenerate_diagram(self, user_query: str, chunks: str) -> dict:
+        """
+        Async variant of `generate_diagram`.
+        """
+
+        invalid = self._check_query(user_query)
+        if invalid:
+            return invalid
+
+        try:
+            prompt = build_diagram_prompt(user_query, chunks)
+
+            raw_output = await self.llm_service.agenerate(prompt)
+
+            return self._build_result(raw_output)
+
+        except Exception as e:
+            return self._error_result(e)
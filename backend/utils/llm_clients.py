@@ -0,0 +1,124 @@
+"""
+Process-wide registry of Gemini clients.
+
+Clients are created lazily on first use and then shared, so every call
+reuses a keep-alive connection pool instead of paying a new TLS
+handshake per request. LLM_MAX_CONNECTIONS, the keep-alive settings and
+LLM_TIMEOUT_SECONDS apply to each pool: the raw genai client's and that
+of every cached LangChain chat model and embeddings instance.
+"""
+
+import threading
+from typing import Dict, Optional, Tuple
+
+import httpx
+from google import genai
+from google.genai import types
+from langchain_google_genai import (
+    ChatGoogleGenerativeAI,
+    GoogleGenerativeAIEmbeddings
+)
+
+from config import settings
+
+_lock = threading.Lock()
+_genai_client: Optional[genai.Client] = None
+_http_clients: Tuple[Optional[httpx.Client], Optional[httpx.AsyncClient]] = (None, None)
+_chat_models: Dict[Tuple[str, Optional[float]], ChatGoogleGenerativeAI] = {}
+_embeddings: Dict[str, GoogleGenerativeAIEmbeddings] = {}
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY_SECONDS
+    )
+
+
+def _client_args() -> dict:
+    """
+    httpx settings for the LangChain models. They always build their own
+    genai.Client, so a shared client cannot be passed in; each cached
+    instance gets its own keep-alive pool with the same limits instead.
+    """
+    return {
+        "limits": _http_limits(),
+        "timeout": httpx.Timeout(settings.LLM_TIMEOUT_SECONDS)
+    }
+
+
+def get_genai_client() -> genai.Client:
+    """Shared google-genai client backed by pooled sync and async HTTP clients."""
+    global _genai_client, _http_clients
+
+    if _genai_client is None:
+        with _lock:
+            if _genai_client is None:
+                if not settings.GEMINI_API_KEY:
+                    raise ValueError("GEMINI_API_KEY not found in environment variables.")
+
+                timeout = httpx.Timeout(settings.LLM_TIMEOUT_SECONDS)
+                _http_clients = (
+                    httpx.Client(limits=_http_limits(), timeout=timeout),
+                    httpx.AsyncClient(limits=_http_limits(), timeout=timeout)
+                )
+                _genai_client = genai.Client(
+                    api_key=settings.GEMINI_API_KEY,
+                    http_options=types.HttpOptions(
+                        httpx_client=_http_clients[0],
+                        httpx_async_client=_http_clients[1]
+                    )
+                )
+
+    return _genai_client
+
+
+def get_chat_model(
+    model: Optional[str] = None,
+    temperature: Optional[float] = None
+) -> ChatGoogleGenerativeAI:
+    """Shared LangChain chat model, one instance per (model, temperature)."""
+    key = (model or settings.GEMINI_MODEL, temperature)
+
+    llm = _chat_models.get(key)
+    if llm is None:
+        with _lock:
+            llm = _chat_models.get(key)
+            if llm is None:
+                kwargs = {"model": key[0], "client_args": _client_args()}
+                if temperature is not None:
+                    kwargs["temperature"] = temperature
+                llm = ChatGoogleGenerativeAI(**kwargs)
+                _chat_models[key] = llm
+
+    return llm
+
+
+def get_embeddings(model: Optional[str] = None) -> GoogleGenerativeAIEmbeddings:
+    """Shared LangChain embeddings client, one instance per model."""
+    name = model or settings.GEMINI_EMBEDDING_MODEL
+
+    embeddings = _embeddings.get(name)
+    if embeddings is None:
+        with _lock:
+            embeddings = _embeddings.get(name)
+            if embeddings is None:
+                embeddings = GoogleGenerativeAIEmbeddings(model=name, client_args=_client_args())
+                _embeddings[name] = embeddings
+
+    return embeddings
+
+
+async def aclose_clients():
+    """Closes the pooled HTTP connections on application shutdown."""
+    global _genai_client, _http_clients
+
+    sync_client, async_client = _http_clients
+    if sync_client is not None:
+        sync_client.close()
+    if async_client is not None:
+        await async_client.aclose()
+
+    _genai_client = None
+    _http_clients = (None, None)
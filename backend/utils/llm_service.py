@@ -1,6 +1,7 @@
 import json
 import re
 from config import settings
+from utils.llm_clients import get_genai_client
 
 
 class LLMService:
@@ -31,26 +32,41 @@ class LLMService:
         except json.JSONDecodeError:
             raise ValueError("Failed to parse Gemini response as JSON.")
 
+    def _parse_response(self, response) -> dict:
+        if not response or not response.text:
+            raise ValueError("Gemini returned empty response.")
+
+        raw_text = response.text.strip()
+
+        cleaned_text = self._clean_response(raw_text)
+
+        return self._extract_json(cleaned_text)
+
     def generate(self, prompt: str) -> dict:
         try:
             # ✅ Correct way to get client
-            client = settings.get_gemini_client()
+            client = get_genai_client()
 
             response = client.models.generate_content(
                 model=settings.GEMINI_MODEL,
                 contents=prompt
             )
 
-            if not response or not response.text:
-                raise ValueError("Gemini returned empty response.")
+            return self._parse_response(response)
 
-            raw_text = response.text.strip()
+        except Exception as e:
+            raise RuntimeError(f"Gemini API error: {str(e)}")
 
-            cleaned_text = self._clean_response(raw_text)
+    async def agenerate(self, prompt: str) -> dict:
+        try:
+            client = get_genai_client()
 
-            parsed_json = self._extract_json(cleaned_text)
+            response = await client.aio.models.generate_content(
+                model=settings.GEMINI_MODEL,
+                contents=prompt
+            )
 
-            return parsed_json
+            return self._parse_response(response)
 
         except Exception as e:
             raise RuntimeError(f"Gemini API error: {str(e)}")
@@ -0,0 +1,43 @@
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict
+
+
+class StageTimer:
+    """
+    Collects wall-clock durations (in milliseconds) for named pipeline stages.
+    Stages may overlap, so the sum of stages can exceed the total.
+    """
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = round((time.perf_counter() - start) * 1000, 2)
+
+    @asynccontextmanager
+    async def astage(self, name: str):
+        with self.stage(name):
+            yield
+
+    def total_ms(self) -> float:
+        return round((time.perf_counter() - self._started) * 1000, 2)
+
+    def as_dict(self) -> Dict[str, float]:
+        return {**self.stages, "total": self.total_ms()}
+
+    def server_timing_header(self) -> str:
+        """
+        Formats the stages as a `Server-Timing` header value so the breakdown
+        shows up in browser dev tools without changing the response body.
+        """
+        return ", ".join(
+            f"{name};dur={duration}"
+            for name, duration in self.as_dict().items()
+        )
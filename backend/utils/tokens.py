@@ -0,0 +1,30 @@
+"""
+Cheap token estimates for prompt budgeting.
+
+Gemini does not ship a local tokenizer, and a count_tokens call per
+prompt section would cost a round trip, so sizes are estimated from
+characters. English prose averages about four characters per token.
+"""
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, max_tokens: int, suffix: str = "...") -> str:
+    """Cuts `text` to roughly `max_tokens`, preferring a word boundary."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+
+    limit = max(0, max_tokens * CHARS_PER_TOKEN - len(suffix))
+    cut = text[:limit]
+    space = cut.rfind(" ")
+    if space > limit // 2:
+        cut = cut[:space]
+    return cut.rstrip() + suffix
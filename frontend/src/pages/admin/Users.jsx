@@ -6,15 +6,17 @@ import { appColors } from '../../config/colors.js';
 
 export default function AdminUsers() {
   const [users, setUsers] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
 
   useEffect(() => {
     fetchUsers();
   }, []);
 
-  const fetchUsers = async () => {
+  const fetchUsers = async (cursor = null) => {
     try {
-      const response = await adminAPI.getUsers();
-      setUsers(response.data);
+      const response = await adminAPI.getUsers(cursor);
+      setUsers((previous) => (cursor ? [...previous, ...response.data] : response.data));
+      setNextCursor(response.headers['x-next-cursor'] || null);
     } catch (error) {
       console.error('Error fetching users:', error);
     }
@@ -94,6 +96,17 @@ export default function AdminUsers() {
               </tbody>
             </table>
           </div>
+          {nextCursor && (
+            <div className="border-t border-[#1F2937] p-3 text-center">
+              <button
+                type="button"
+                onClick={() => fetchUsers(nextCursor)}
+                className="rounded-lg border border-[#1F2937] px-4 py-1.5 text-xs text-[#E5E7EB] hover:bg-[#020617] sm:text-sm"
+              >
+                Load more
+              </button>
+            </div>
+          )}
         </div>
       </div>
     </Layout>
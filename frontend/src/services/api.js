@@ -82,7 +82,7 @@ export const facultyAPI = {
 // Admin APIs
 export const adminAPI = {
     getDashboard: () => apiClient.get('/admin/dashboard'),
-    getUsers: () => apiClient.get('/admin/users'),
+    getUsers: (cursor) => apiClient.get('/admin/users', { params: cursor ? { cursor } : {} }),
     createUser: (userData) => apiClient.post('/admin/users', userData),
     updateUser: (userId, userData) => apiClient.put(`/admin/users/${userId}`, userData),
     deleteUser: (userId) => apiClient.delete(`/admin/users/${userId}`),